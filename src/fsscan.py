@@ -1,6 +1,21 @@
 import os
+import re
+import mmap
 import stat
 import hashlib
+import functools
+import operator
+import itertools
+import types
+import fnmatch
+import sqlite3
+import dataclasses
+from collections import deque, defaultdict
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+
+from . import linux_statx
+from .scan_cache import ScanCache, MemoryCache, DEFAULT_CACHE_PATH
 
 def get_file_extension(file_name: str) -> str | None:
     """
@@ -11,85 +26,109 @@ def get_file_extension(file_name: str) -> str | None:
 
     Returns:
         The file extension without the leading dot (e.g., "txt", "gz").
-        Returns an empty string if the file has no extension or
-        if the file name starts with a dot and has no other dots (e.g., ".bashrc" would return "").
+        Returns None if the file has no extension, if the name ends with a dot, or
+        if the file name's only dots are leading ones (e.g., ".bashrc", "..bashrc").
         Returns the part after the last dot if multiple dots are present (e.g., "archive.tar.gz" returns "gz").
     """
     if not isinstance(file_name, str):
         raise TypeError("Input must be a string.")
 
-    # os.path.splitext splits the path into a pair (root, ext)
-    # For example, splitext("mydoc.txt") returns ("mydoc", ".txt")
-    # If there's no dot, or if it's the first character, ext will be empty.
-    # e.g. splitext("nodot") -> ("nodot", "")
-    # e.g. splitext(".bashrc") -> (".bashrc", "") - special case for dotfiles
-    # e.g. splitext("archive.tar.gz") -> ("archive.tar", ".gz")
-    root, extension_with_dot = os.path.splitext(file_name)
-
-    # Handle cases like ".bashrc" where splitext returns (".bashrc", "")
-    # In such cases, we consider it as having no extension part to return.
-    # However, if the filename is just "." or "..", it should also have no extension.
-    if not extension_with_dot and file_name.startswith('.') and file_name != '.' and file_name != '..':
-        # If the original filename started with a dot and splitext returned an empty extension,
-        # it means it was a "dotfile" without a further extension part (e.g., ".bashrc").
-        # We want to return "" in this case, not "bashrc".
-        # If we simply sliced extension_with_dot[1:], it would be an error on empty string.
+    # A single scan from the end splits at the last dot. A head of nothing but dots
+    # means no dot at all, or only leading ones as in ".bashrc", "..bashrc" or ".".
+    head, _, extension = file_name.rpartition('.')
+    if not head.strip('.'):
         return None
 
-    # If an extension exists (e.g., ".txt"), return it without the leading dot.
-    if extension_with_dot:
-        return extension_with_dot[1:]
-    else:
-        # No extension found (e.g., "filename" or "filename.")
-        return None
+    # Empty for "filename." and ".."
+    return extension if extension else None
 
-def get_file_size_in_bytes(file_path):
+def _dir_fd_opener(dir_fd):
+    """Returns an opener for open() that resolves paths relative to dir_fd (or None)."""
+    if dir_fd is None:
+        return None
+    return functools.partial(os.open, dir_fd=dir_fd)
+
+# hashlib, open()/read() and os.stat all release the GIL, so a pool of threads
+# keeps both the disk queue and the CPU cores busy while the tree is scanned.
+MAX_IO_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# get_folder_tree only reads the content of files up to this size...
+MAX_CONTENT_BYTES = 256 * 1024
+# ...and does not checksum files larger than this at all.
+MAX_HASH_BYTES = 256 * 1024 * 1024
+
+# Extensions whose content is read without first checking for binary data.
+TEXT_EXTENSIONS = frozenset({
+    "txt", "md", "rst", "csv", "log",
+    "py", "pyi", "ipynb", "c", "h", "cc", "cpp", "hpp", "cs", "java", "kt", "scala", "go", "rs",
+    "swift", "m", "rb", "php", "pl", "lua", "r", "js", "jsx", "mjs", "ts", "tsx", "vue",
+    "sh", "bash", "zsh", "fish", "ps1", "bat", "sql", "gradle", "cmake", "mk",
+    "html", "htm", "css", "scss", "less", "xml", "svg",
+    "json", "yaml", "yml", "toml", "ini", "cfg", "conf", "properties", "env",
+})
+# Files with any other extension are read only if no NUL shows up in this many leading bytes.
+BINARY_SNIFF_BYTES = 512
+
+def get_file_size_in_bytes(file_path, st=None):
     """
     Calculates the size of a file in bytes.
 
     Args:
         file_path (str): The path to the file.
+        st (os.stat_result, optional): A stat result already fetched for file_path.
+                                       When given, no further syscalls are made.
 
     Returns:
         int: The size of the file in bytes, or None if an error occurs.
     """
-    try:
-        # Check if the path exists and is a file
-        if not os.path.exists(file_path):
+    if st is None:
+        # One stat answers existence, type and size at once
+        try:
+            st = os.stat(file_path)
+        except FileNotFoundError:
             print(f"Error: File not found at '{file_path}'")
             return None
-        if not os.path.isfile(file_path):
-            print(f"Error: '{file_path}' is a directory, not a file.")
+        except OSError as e:
+            # Handle potential OS-related errors (e.g., permission issues)
+            print(f"Error accessing file '{file_path}': {e}")
+            return None
+        except Exception as e:
+            # Handle any other unexpected errors
+            print(f"An unexpected error occurred: {e}")
             return None
 
-        # Get the file size in bytes
-        file_size = os.path.getsize(file_path)
-        return file_size
-    except OSError as e:
-        # Handle potential OS-related errors (e.g., permission issues)
-        print(f"Error accessing file '{file_path}': {e}")
-        return None
-    except Exception as e:
-        # Handle any other unexpected errors
-        print(f"An unexpected error occurred: {e}")
+    if not stat.S_ISREG(st.st_mode):
+        print(f"Error: '{file_path}' is not a regular file.")
         return None
+    return st.st_size
 
-def read_file_to_string(filepath: str) -> str | None:
+# Files at least this large are decoded straight out of a read-only mapping
+READ_MMAP_MIN_BYTES = 64 * 1024
+
+def _decode_text(data):
+    """Decodes UTF-8 from any buffer, translating newlines the way text-mode open() does."""
+    return str(data, 'utf-8').replace('\r\n', '\n').replace('\r', '\n')
+
+def read_file_to_string(filepath: str, dir_fd: int | None = None) -> str | None:
     """
     Reads the content of a text file into a string.
 
     Args:
         filepath: The path to the text file.
+        dir_fd: Optional directory file descriptor; filepath is then resolved relative to it.
 
     Returns:
         The content of the file as a string, or None if an error occurs.
     """
     try:
-        # Open the file in read mode ('r') with UTF-8 encoding (common for text files)
-        with open(filepath, 'r', encoding='utf-8') as file:
-            # Read the entire content of the file
-            content = file.read()
-        return content
+        # Open the file unbuffered in binary mode and decode it in one go as UTF-8
+        with open(filepath, 'rb', buffering=0, opener=_dir_fd_opener(dir_fd)) as file:
+            if os.fstat(file.fileno()).st_size >= READ_MMAP_MIN_BYTES:
+                # Decode from the page cache directly, without first copying
+                # the whole file into a bytes object
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    return _decode_text(mm)
+            return _decode_text(file.read())
     except FileNotFoundError:
         print(f"Error: The file '{filepath}' was not found.")
         return None
@@ -100,41 +139,156 @@ def read_file_to_string(filepath: str) -> str | None:
         print(f"An unexpected error occurred: {e}")
         return None
 
-def calculate_file_checksum(file_path, hash_algorithm="sha256", chunk_size=4096):
+# blake3 is an optional dependency. Inputs of at least this size are hashed on all
+# cores; below it the thread start-up costs more than it saves.
+BLAKE3_THREADING_MIN_BYTES = 1 << 20
+
+@functools.lru_cache(maxsize=None)
+def _blake3_module():
+    """Imports the optional blake3 package once; returns None if it is not installed."""
+    try:
+        import blake3
+    except ImportError:
+        return None
+    return blake3
+
+# Constructor per name hashlib.new accepts here, less the SHAKE functions whose hexdigest
+# needs a length. Checking membership rather than hasattr(hashlib, name) also rejects
+# helpers such as "new". Named constructors (hashlib.sha256) skip hashlib.new's name
+# dispatch; OpenSSL-only algorithms go through hashlib.new.
+_HASH_CTORS = {
+    name: getattr(hashlib, name, None) or functools.partial(hashlib.new, name)
+    for name in hashlib.algorithms_available if not name.startswith("shake_")
+}
+
+def _new_hasher(hash_algorithm, size=0):
+    """
+    Creates a hash object for hash_algorithm, or prints an error and returns None if unsupported.
+
+    "blake3" is served by the blake3 package (multithreaded when size is at least
+    BLAKE3_THREADING_MIN_BYTES) and falls back to sha256 when it is not installed.
+    """
+    if hash_algorithm == "blake3":
+        blake3 = _blake3_module()
+        if blake3 is not None:
+            if size >= BLAKE3_THREADING_MIN_BYTES:
+                return blake3.blake3(max_threads=blake3.blake3.AUTO)
+            return blake3.blake3()
+        hash_algorithm = "sha256"
+
+    # Ensure the hash algorithm is supported by hashlib
+    ctor = _HASH_CTORS.get(hash_algorithm)
+    if ctor is None:
+        print(f"Error: Unsupported hash algorithm '{hash_algorithm}'.")
+        print(f"Supported algorithms: {set(_HASH_CTORS) | {'blake3'}}")
+        return None
+    return ctor()
+
+def effective_hash_algorithm(hash_algorithm):
+    """
+    Returns the name of the algorithm actually used when hash_algorithm is requested.
+
+    Only "blake3" can differ: it becomes "sha256" when the blake3 package is not
+    installed. Both digests are 64 hex characters, so callers comparing checksums
+    across machines should record this alongside them.
+    """
+    if hash_algorithm == "blake3" and _blake3_module() is None:
+        return "sha256"
+    return hash_algorithm
+
+# Files larger than this are hashed straight from a read-only mapping rather
+# than copied chunk by chunk through a userspace buffer.
+MMAP_MIN_BYTES = 4 << 20
+
+def _update_from_mmap(hasher, fd):
+    """Feeds the whole file open as fd to hasher through a read-only memory mapping."""
+    with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+        if hasattr(mm, "madvise"):
+            # Ask for aggressive readahead; pages are consumed strictly in order
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+        hasher.update(mm)
+
+# How much of a file to ask the kernel to start reading in the background before hashing
+READAHEAD_BYTES = 64 << 20
+
+def _fadvise(fd, advice, length=0):
+    """
+    Passes an access-pattern hint for the first length bytes of fd (0 meaning all of it) to the kernel.
+
+    A no-op where posix_fadvise is unavailable (Windows, macOS) or refused by the file system.
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        os.posix_fadvise(fd, 0, length, getattr(os, advice))
+    except OSError:
+        pass
+
+def calculate_file_checksum(file_path, hash_algorithm="sha256", chunk_size=1 << 20, dir_fd=None):
     """
     Calculates the checksum of a file using the specified hash algorithm.
 
     Args:
         file_path (str): The path to the file.
-        hash_algorithm (str, optional): The hash algorithm to use (e.g., "md5", "sha1", "sha256", "sha512").
-                                         Defaults to "sha256".
-        chunk_size (int, optional): The size of chunks to read from the file (in bytes).
-                                    Defaults to 4096.
+        hash_algorithm (str, optional): The hash algorithm to use (e.g., "blake3", "md5", "sha1", "sha256", "sha512").
+                                         Defaults to "sha256". "blake3" falls back to "sha256" when the
+                                         blake3 package is not installed (see effective_hash_algorithm).
+        chunk_size (int, optional): The size of chunks to read from the file (in bytes) on
+                                    interpreters without hashlib.file_digest. Defaults to 1 MiB.
+        dir_fd (int, optional): Directory file descriptor; file_path is then resolved relative to it.
 
     Returns:
         str: The hexadecimal representation of the file's checksum.
              Returns None if the file is not found or an error occurs.
     """
-    # Ensure the hash algorithm is supported by hashlib
-    if not hasattr(hashlib, hash_algorithm):
-        print(f"Error: Unsupported hash algorithm '{hash_algorithm}'.")
-        print(f"Supported algorithms: {hashlib.algorithms_available}")
-        return None
-
     # Create a hash object
-    hasher = hashlib.new(hash_algorithm)
+    hasher = _new_hasher(hash_algorithm)
+    if hasher is None:
+        return None
 
     try:
-        # Open the file in binary read mode
-        with open(file_path, 'rb') as f:
-            while True:
-                # Read a chunk of the file
-                chunk = f.read(chunk_size)
-                if not chunk:
-                    # End of file
-                    break
-                # Update the hash object with the chunk
-                hasher.update(chunk)
+        # Open the file unbuffered in binary read mode; we already read in large blocks
+        with open(file_path, 'rb', buffering=0, opener=_dir_fd_opener(dir_fd)) as f:
+            fd = f.fileno()
+            # Ask for aggressive read-ahead now, and drop the pages once hashed so
+            # scanning a large tree doesn't evict everything else from the page cache.
+            _fadvise(fd, "POSIX_FADV_SEQUENTIAL")
+            try:
+                size = os.fstat(fd).st_size
+                if size:
+                    # Start populating the page cache asynchronously so the disk keeps
+                    # reading ahead while the first window is being hashed
+                    _fadvise(fd, "POSIX_FADV_WILLNEED", min(size, READAHEAD_BYTES))
+                blake3_threads = (hash_algorithm == "blake3" and _blake3_module() is not None
+                                  and size >= BLAKE3_THREADING_MIN_BYTES)
+                if blake3_threads or size > MMAP_MIN_BYTES:
+                    if blake3_threads:
+                        # A single update over the whole mapping lets blake3 split the work across cores
+                        hasher = _new_hasher(hash_algorithm, size)
+                    try:
+                        _update_from_mmap(hasher, fd)
+                        return hasher.hexdigest()
+                    except (OSError, ValueError) as e:
+                        # mmap can be refused (e.g. locked files on Windows); nothing has been
+                        # hashed yet, so fall back to reading in chunks
+                        print(f"Warning: Could not map '{file_path}', reading it in chunks instead: {e}")
+
+                file_digest = getattr(hashlib, "file_digest", None)
+                if file_digest is not None:
+                    # Python 3.11+: let hashlib drive the read/update loop; the lambda
+                    # hands it the hasher built above (which may be a blake3 object)
+                    return file_digest(f, lambda: hasher).hexdigest()
+
+                # Fill one reusable buffer in place instead of allocating a new bytes
+                # object per chunk; the memoryview slice hands hashlib exactly n bytes.
+                # With buffering=0, readinto is a single read(2) straight into buf.
+                # Small files get a buffer sized to them rather than a zero-filled 1 MiB.
+                buf = bytearray(min(chunk_size, size + 1))
+                view = memoryview(buf)
+                while (n := f.readinto(buf)):
+                    hasher.update(view[:n])
+            finally:
+                _fadvise(fd, "POSIX_FADV_DONTNEED")
         # Return the hexadecimal representation of the digest
         return hasher.hexdigest()
     except FileNotFoundError:
@@ -144,116 +298,671 @@ def calculate_file_checksum(file_path, hash_algorithm="sha256", chunk_size=4096)
         print(f"An error occurred: {e}")
         return None
 
-def print_directory_tree(root_dir, indent_char='|   ', file_prefix='|-- ', dir_prefix='+-- '):
-    """Prints a directory tree structure."""
-    tree = ""
-    for root, dirs, files in os.walk(root_dir):
-        level = root.replace(root_dir, '').count(os.sep)
+def read_and_hash(file_path, hash_algorithm="blake3", dir_fd=None, size_hint=None, decode=True,
+                  sniff_binary=False):
+    """
+    Calculates the checksum of a file and decodes it as UTF-8 text in a single pass.
+
+    Equivalent to calling calculate_file_checksum and read_file_to_string, but the
+    file is opened and read only once.
+
+    Args:
+        file_path (str): The path to the file.
+        hash_algorithm (str, optional): The hash algorithm to use, as for calculate_file_checksum.
+                                         Defaults to "blake3".
+        dir_fd (int, optional): Directory file descriptor; file_path is then resolved relative to it.
+        size_hint (int, optional): The file size, if the caller has already stat'ed it.
+        decode (bool, optional): Whether to decode the content at all. Defaults to True.
+        sniff_binary (bool, optional): Treat the file as binary, and skip decoding it, if a NUL
+                                       byte shows up in its first BINARY_SNIFF_BYTES bytes.
+                                       Defaults to False.
+
+    Returns:
+        tuple: (checksum, content, size). content is None if the file is not valid UTF-8,
+               looks binary or decode is False.
+               All three are None if the file cannot be read.
+    """
+    hasher = _new_hasher(hash_algorithm)
+    if hasher is None:
+        return None, None, None
+
+    try:
+        # Plain open/read/close on a raw descriptor: the io stack behind open()
+        # adds its own fstat and lseek calls, and its readall() needs a second
+        # read() just to see EOF.
+        fd = os.open(file_path, os.O_RDONLY | getattr(os, "O_BINARY", 0), dir_fd=dir_fd)
+        try:
+            if size_hint is None:
+                size_hint = os.fstat(fd).st_size
+            # Ask for the whole file in one read, then read on until EOF: network and
+            # FUSE file systems may return short reads, and the file may have grown.
+            data = os.read(fd, size_hint + 1)
+            if data:
+                chunks = [data]
+                while (chunk := os.read(fd, 1 << 20)):
+                    chunks.append(chunk)
+                if len(chunks) > 1:
+                    data = b"".join(chunks)
+        finally:
+            os.close(fd)
+    except FileNotFoundError:
+        print(f"Error: File not found at '{file_path}'.")
+        return None, None, None
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        return None, None, None
+
+    hasher.update(data)
+    content = None
+    if decode and not (sniff_binary and b"\x00" in data[:BINARY_SNIFF_BYTES]):
+        try:
+            content = _decode_text(data)
+        except UnicodeDecodeError:
+            pass
+    return hasher.hexdigest(), content, len(data)
+
+# Directories that hold tooling state, dependencies or build output rather than
+# sources; iter_tree reports them as 'directory_skipped' instead of descending.
+DEFAULT_EXCLUDE_DIRS = frozenset({
+    ".git", "node_modules", "__pycache__", ".venv", ".mypy_cache", ".pytest_cache",
+    "dist", "build", "target",
+})
+
+def _sorted_scandir(dir_path):
+    """Lists dir_path as DirEntry objects sorted by name."""
+    with os.scandir(dir_path) as it:
+        return sorted(it, key=operator.attrgetter("name"))
+
+def print_directory_tree(root_dir, indent_char='|   ', file_prefix='|-- ', dir_prefix='+-- ',
+                         exclude_dirs=DEFAULT_EXCLUDE_DIRS):
+    """
+    Prints a directory tree structure.
+
+    Directories named in exclude_dirs (by default the same ones get_folder_tree skips)
+    are listed but not descended into.
+    """
+    try:
+        root_entries = _sorted_scandir(root_dir)
+    except OSError as e:
+        print(f"Warning: Could not walk directory {root_dir}: {e}")
+        return ""
+
+    # Collect the lines and join once at the end; growing a string with
+    # tree = tree + line copies everything built so far on every line.
+    parts = [f"{dir_prefix}{os.path.basename(root_dir)}/\n"]
+    # Depth-first with an explicit stack of (remaining entries, depth) so each
+    # directory's contents are printed right under it, whatever the nesting.
+    stack = [(iter(root_entries), 1)]
+    while stack:
+        entries, level = stack[-1]
+        entry = next(entries, None)
+        if entry is None:
+            stack.pop()
+            continue
+
         indent = indent_char * level
-        tree = tree + f"{indent}{dir_prefix}{os.path.basename(root)}/\n"
+        # The type comes from the directory listing itself; no stat per entry
+        if entry.is_dir(follow_symlinks=False):
+            parts.append(f"{indent}{dir_prefix}{entry.name}/\n")
+            if entry.name in exclude_dirs:
+                continue
+            try:
+                stack.append((iter(_sorted_scandir(entry.path)), level + 1))
+            except OSError as e:
+                print(f"Warning: Could not walk directory {entry.path}: {e}")
+        else:
+            parts.append(f"{indent}{file_prefix}{entry.name}\n")
+
+    return "".join(parts)
+
+# Algorithm get_folder_tree hashes files with (see effective_hash_algorithm)
+TREE_HASH_ALGORITHM = "blake3"
+
+def _read_file_job(node, dir_fd, include_content=True):
+    """
+    Worker job for get_folder_tree: checksum and content of one file node in dir_fd.
 
-        sub_indent = indent_char * (level + 1)
-        for f in files:
-            tree = tree + f"{sub_indent}{file_prefix}{f}\n"
+    Large files are hashed without being read into memory, huge ones are not
+    hashed at all, and content is dropped for files that look binary or when
+    include_content is False.
+    """
+    if node["size"] > MAX_HASH_BYTES:
+        return None, None
+    if node["size"] > MAX_CONTENT_BYTES:
+        return calculate_file_checksum(node["name"], TREE_HASH_ALGORITHM, dir_fd=dir_fd), None
+
+    # The binary sniff runs on the raw bytes, so binary files are never decoded
+    checksum, content, _ = read_and_hash(node["name"], TREE_HASH_ALGORITHM, dir_fd=dir_fd,
+                                         size_hint=node["size"], decode=include_content,
+                                         sniff_binary=node["extension"] not in TEXT_EXTENSIONS)
+    return checksum, content
+
+def _make_lut_filemode():
+    """
+    Builds an equivalent of stat.filemode that answers with two table lookups.
 
-    return tree
+    The tables hold the file type character, and the nine permission characters
+    for every combination of the low 12 mode bits (including setuid/setgid/sticky).
+    """
+    type_chars = {
+        file_type: stat.filemode(file_type)[0]
+        for file_type in (stat.S_IFDIR, stat.S_IFCHR, stat.S_IFBLK, stat.S_IFREG,
+                          stat.S_IFIFO, stat.S_IFLNK, stat.S_IFSOCK)
+    }
+    permission_chars = tuple(stat.filemode(bits)[1:] for bits in range(0o10000))
+
+    def lut_filemode(mode):
+        return type_chars.get(stat.S_IFMT(mode), '?') + permission_chars[mode & 0o7777]
+
+    return lut_filemode
+
+# CPython implements stat.filemode in C (_stat), which is faster than the lookup
+# tables; they only pay off where stat falls back to its pure-Python version.
+if isinstance(stat.filemode, types.BuiltinFunctionType):
+    _filemode = stat.filemode
+else:
+    _filemode = _make_lut_filemode()
+
+def _get_permissions(item_path, st=None):
+    """Helper function to get permissions in a human-readable format."""
+    if st is not None:
+        return _filemode(st.st_mode)
+    try:
+        mode = linux_statx.stat(item_path).st_mode
+        return _filemode(mode)
+    except OSError as e:
+        # Handle cases like permission denied for os.stat()
+        print(f"Warning: Could not get permissions for {item_path}: {e}")
+        return "Permission denied or error"
+
+def _inaccessible_node(dir_path, relative_dir):
+    """Node standing in for a directory whose contents cannot be listed."""
+    return {
+        "name": os.path.basename(dir_path),
+        "full_path": dir_path,
+        # The root itself has no relative path; it is reported by name
+        "relative_path": relative_dir or os.path.basename(dir_path),
+        "permissions": "d????????? (Permission Denied)",
+        "type": "directory_inaccessible",
+        "children": []
+    }
+
+
+@dataclasses.dataclass(slots=True, eq=False)
+class FileNode(Mapping):
+    """
+    One file, directory or other entry of a tree scanned with compact_nodes=True.
 
-def get_folder_tree(root_folder_path):
+    A slotted object takes well under half the memory of a dict with the same keys, and
+    still reads like one: node['name'], node.get('content'), dict(node) and comparison
+    with plain dicts all work. It is not a dict instance, though, so serialize it with
+    to_dict() (e.g. json.dumps(node.to_dict())). Entries standing in for inaccessible or
+    skipped directories carry other keys and remain plain dicts.
+    """
+    name: str
+    full_path: str
+    relative_path: str
+    permissions: str
+    checksum: str | None
+    size: int | None
+    extension: str | None
+    content: str | None
+    type: str
+
+    def __getitem__(self, key):
+        if key not in _FILE_NODE_KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in _FILE_NODE_KEYS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __iter__(self):
+        return iter(_FILE_NODE_KEYS)
+
+    def __len__(self):
+        return len(_FILE_NODE_KEYS)
+
+    def to_dict(self):
+        """Returns the node as the plain dict get_folder_tree yields by default."""
+        return {key: getattr(self, key) for key in _FILE_NODE_KEYS}
+
+_FILE_NODE_KEYS = tuple(f.name for f in dataclasses.fields(FileNode))
+
+def _skipped_node(full_path, relative_path):
+    """Node standing in for an excluded directory that was not descended into."""
+    return {
+        "name": os.path.basename(full_path),
+        "full_path": full_path,
+        "relative_path": relative_path,
+        "type": "directory_skipped"
+    }
+
+@functools.lru_cache(maxsize=None)
+def _pathspec_module():
+    """Imports the optional pathspec package once, returning None if it is not installed."""
+    try:
+        import pathspec
+    except ImportError:
+        return None
+    return pathspec
+
+@functools.lru_cache(maxsize=None)
+def _warn_pathspec_missing():
+    """Says, once per process, that .gitignore files are not honoured without pathspec."""
+    print("Warning: .gitignore files are ignored: install the pathspec package to honour them")
+
+def _load_gitignore(base_path):
+    """
+    Returns a PathSpec for base_path/.gitignore, or None if there is none or pathspec is not installed.
+
+    Only the root's .gitignore is read; nested .gitignore files, .git/info/exclude and
+    the global excludes file are not.
+    """
+    try:
+        with open(os.path.join(base_path, ".gitignore"), encoding="utf-8") as f:
+            pathspec = _pathspec_module()
+            if pathspec is None:
+                _warn_pathspec_missing()
+                return None
+            return pathspec.PathSpec.from_lines("gitwildmatch", f)
+    except (OSError, UnicodeDecodeError):
+        return None
+
+def _make_exclude_filter(base_path, exclude_dirs, exclude_globs, use_gitignore):
+    """
+    Builds the predicate iter_tree prunes entries with.
+
+    Returns:
+        callable: excluded(name, relative_path, is_dir) -> bool, True for entries to leave out.
+    """
+    exclude_dirs = frozenset(exclude_dirs or ())
+    # One combined regex instead of an fnmatch call per glob per entry
+    glob_match = re.compile("|".join(fnmatch.translate(g) for g in exclude_globs)).match if exclude_globs else None
+    gitignore = _load_gitignore(base_path) if use_gitignore else None
+
+    def excluded(name, relative_path, is_dir):
+        if is_dir and name in exclude_dirs:
+            return True
+        if glob_match is not None and (glob_match(name) or glob_match(relative_path)):
+            return True
+        if gitignore is not None:
+            return gitignore.match_file(relative_path.replace(os.sep, "/") + ("/" if is_dir else ""))
+        return False
+
+    return excluded
+
+# Shared by every scan in this process, so rescanning a tree skips sqlite3 as well as hashing
+_MEMORY_CACHE = MemoryCache()
+
+def _open_scan_cache(cache_path):
+    """Opens the ScanCache at cache_path, or returns None if disabled or unavailable."""
+    if cache_path is None:
+        return None
+    try:
+        return ScanCache(cache_path, memory=_MEMORY_CACHE)
+    except (sqlite3.Error, OSError) as e:
+        print(f"Warning: Could not open scan cache {cache_path}: {e}")
+        return None
+
+def _drop_scan_cache(cache, error):
+    """Reports a failing scan cache and closes it, so the scan carries on without one."""
+    print(f"Warning: Scan cache failed, continuing without it: {error}")
+    try:
+        cache.close()
+    except sqlite3.Error:
+        pass
+    return None
+
+def _open_directory(dir_path):
+    """
+    Opens dir_path and lists it, sorted by name.
+
+    Returns:
+        tuple: (dir_fd, entries). The caller owns dir_fd and must close it; entries
+               stat and open relative to it (fstatat/openat) instead of resolving
+               the full path again.
+    """
+    dir_fd = os.open(dir_path, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+    try:
+        with os.scandir(dir_fd) as it:
+            return dir_fd, sorted(it, key=operator.attrgetter("name"))
+    except BaseException:
+        os.close(dir_fd)
+        raise
+
+def iter_tree(root_folder_path, cache_path=DEFAULT_CACHE_PATH, exclude_dirs=DEFAULT_EXCLUDE_DIRS,
+              exclude_globs=(), use_gitignore=True, include_content=False, compact_nodes=False):
+    """
+    Lazily yields the nodes get_folder_tree returns, one directory at a time.
+
+    Directories are walked with an explicit stack instead of recursion, so deep
+    trees are not limited by Python's recursion limit and callers can consume
+    nodes while the rest of the tree is still being scanned.
+
+    Args:
+        root_folder_path (str): The absolute or relative path to the folder. It is not
+                                validated; an unreadable root yields a single
+                                'directory_inaccessible' node.
+        cache_path (str, optional): As for get_folder_tree.
+        exclude_dirs, exclude_globs, use_gitignore, include_content, compact_nodes:
+            As for get_folder_tree.
+
+    Yields:
+        dict: One node per file, directory or other entry under root_folder_path.
+    """
+    base_path = os.path.abspath(root_folder_path)
+    excluded = _make_exclude_filter(base_path, exclude_dirs, exclude_globs, use_gitignore)
+    return _walk_tree(base_path, cache_path, excluded, include_content, compact_nodes)
+
+def _walk_tree(base_path, cache_path, excluded, include_content, compact_nodes):
+    """The generator behind iter_tree, for an absolute base_path and a prebuilt exclude filter."""
+    cache = _open_scan_cache(cache_path)
+    cache_algorithm = effective_hash_algorithm(TREE_HASH_ALGORITHM)
+    if not include_content:
+        # Entries recorded without content must never answer a scan that wants it
+        cache_algorithm += ":checksum-only"
+    # (directory, its path relative to base_path) pairs, so relative paths are
+    # built by joining names instead of recomputing relpath per directory
+    stack = deque([(base_path, "")])
+
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_IO_WORKERS) as executor:
+            while stack:
+                dir_path, relative_dir = stack.pop()
+                try:
+                    dir_fd, entries = _open_directory(dir_path)
+                except PermissionError:
+                    print(f"Warning: Permission denied to access directory {dir_path}")
+                    yield _inaccessible_node(dir_path, relative_dir)
+                    continue
+                except OSError as e:
+                    print(f"Warning: Could not list directory {dir_path}: {e}")
+                    continue
+
+                dir_nodes = []
+                sub_dirs = []
+                file_nodes = []
+                file_stats = []
+
+                try:
+                    for entry in entries:
+                        item_name = entry.name
+                        full_path = os.path.join(dir_path, item_name)
+
+                        # Top-level items are relative to the root as their bare name
+                        relative_path = os.path.join(relative_dir, item_name) if relative_dir else item_name
+
+                        # d_type from the directory listing is enough to prune without a stat
+                        try:
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                        except OSError:
+                            is_dir = False
+                        if excluded(item_name, relative_path, is_dir):
+                            if is_dir:
+                                dir_nodes.append(_skipped_node(full_path, relative_path))
+                            continue
+
+                        try:
+                            st = linux_statx.stat(item_name, dir_fd=dir_fd, follow_symlinks=False)
+                        except OSError as e:
+                            # The entry vanished or cannot be stat'ed; nothing useful to report
+                            print(f"Warning: Could not stat {full_path}: {e}")
+                            continue
+
+                        permissions = _get_permissions(full_path, st)
+                        filesize = get_file_size_in_bytes(full_path, st) if stat.S_ISREG(st.st_mode) else None
+                        extension = get_file_extension(item_name)
+
+                        # Anything but directories and regular files (symlinks, special
+                        # files, etc.) is "other"
+                        node_type = "other"
+                        checksum = content = cached = None
+                        if stat.S_ISDIR(st.st_mode):
+                            node_type = "directory"
+                            sub_dirs.append((full_path, relative_path))
+                        elif stat.S_ISREG(st.st_mode):
+                            node_type = "file"
+                            if cache is not None:
+                                try:
+                                    cached = cache.get(st, cache_algorithm)
+                                except sqlite3.Error as e:
+                                    cache = _drop_scan_cache(cache, e)
+                            if cached is not None:
+                                checksum, content = cached
+
+                        if compact_nodes:
+                            node = FileNode(item_name, full_path, relative_path, permissions,
+                                            checksum, filesize, extension, content, node_type)
+                        else:
+                            node = {
+                                "name": item_name,
+                                "full_path": full_path,
+                                "relative_path": relative_path,
+                                "permissions": permissions,
+                                "checksum": checksum,
+                                "size": filesize,
+                                "extension": extension,
+                                "content": content,
+                                "type": node_type
+                            }
+
+                        if node_type == "file" and cached is None:
+                            # checksum and content are filled in below, once this directory's
+                            # batch of file jobs has run on the pool
+                            file_nodes.append(node)
+                            file_stats.append(st)
+
+                        dir_nodes.append(node)
+
+                    # Batch per directory: dir_fd has to outlive the jobs, and it bounds
+                    # the number of file contents held in flight at once.
+                    results = executor.map(_read_file_job, file_nodes, itertools.repeat(dir_fd),
+                                           itertools.repeat(include_content))
+                    for node, (checksum, content) in zip(file_nodes, results):
+                        node["checksum"] = checksum
+                        node["content"] = content
+                finally:
+                    os.close(dir_fd)
+
+                if cache is not None and file_nodes:
+                    # A None checksum means the read failed (or the file is too large to
+                    # hash, which costs nothing to redo). Don't record it: the cause, such as a
+                    # transient I/O error, need not touch the file's stat, so a cached
+                    # failure could outlive it.
+                    try:
+                        cache.put_many(((st, node["checksum"], node["content"])
+                                        for st, node in zip(file_stats, file_nodes)
+                                        if node["checksum"] is not None), cache_algorithm)
+                    except sqlite3.Error as e:
+                        cache = _drop_scan_cache(cache, e)
+
+                # Reversed so that subdirectories are popped, and listed, in name order
+                stack.extend(reversed(sub_dirs))
+                yield from dir_nodes
+    finally:
+        if cache is not None:
+            try:
+                cache.close()
+            except sqlite3.Error as e:
+                print(f"Warning: Could not save scan cache: {e}")
+
+def _is_scannable_root(abs_root_path, root_folder_path):
+    """Checks that abs_root_path is an existing directory, printing why not otherwise."""
+    # One stat answers both "does it exist" and "is it a directory"
+    try:
+        st = os.stat(abs_root_path)
+    except FileNotFoundError:
+        print(f"Error: Path '{root_folder_path}' does not exist.")
+        return False
+    except OSError as e:
+        print(f"Error: Could not access '{root_folder_path}': {e}")
+        return False
+    if not stat.S_ISDIR(st.st_mode):
+        print(f"Error: Path '{root_folder_path}' is not a directory.")
+        return False
+    return True
+
+def get_folder_tree(root_folder_path, cache_path=DEFAULT_CACHE_PATH, exclude_dirs=DEFAULT_EXCLUDE_DIRS,
+                    exclude_globs=(), use_gitignore=True, include_content=False, compact_nodes=False):
     """
     Generates a tree structure of files and folders for a given path.
 
     Args:
         root_folder_path (str): The absolute or relative path to the folder.
+        cache_path (str, optional): sqlite3 file caching checksums and content of unchanged
+                                    files across calls (see ScanCache). Defaults to
+                                    ~/.cache/project-explorer-agent/scan.db; None disables it.
+                                    Files are stat'ed without forcing a sync, so on
+                                    NFS/CIFS a file changed on another machine may be
+                                    served from the cache until its attributes expire.
+        exclude_dirs (iterable, optional): Directory names not to descend into. Each one is
+                                           reported as a 'directory_skipped' node.
+                                           Defaults to DEFAULT_EXCLUDE_DIRS.
+        exclude_globs (iterable, optional): fnmatch patterns, matched against both the name
+                                            and the relative path of every entry. Matching files
+                                            are left out; matching directories are skipped.
+        use_gitignore (bool, optional): Also honour the root folder's .gitignore (nested
+                                        .gitignore files are not read). Needs the optional
+                                        pathspec package; without it the file is ignored
+                                        and a warning is printed, once per process.
+                                        Defaults to True.
+        include_content (bool, optional): Fill in the 'content' of text files. Off by default,
+                                          so a scan only holds checksums and metadata;
+                                          use read_file_to_string on a node's full_path to
+                                          load a single file on demand.
+        compact_nodes (bool, optional): Return files, directories and other entries as
+                                        FileNode objects instead of dicts, to save memory on
+                                        large trees. They read like dicts but are not dict
+                                        instances; use FileNode.to_dict() to serialize them.
+                                        Defaults to False.
 
     Returns:
-        list: A list of dictionaries, where each dictionary represents a file or folder
-              in the root_folder_path. For directories, a 'children' key will contain
+        list: A list of nodes, where each node (a dict, or a FileNode with compact_nodes)
+              represents a file or folder in the root_folder_path. For directories, a 'children' key will contain
               a list of its contents. Returns None if the path is invalid.
+              File checksums are computed with effective_hash_algorithm(TREE_HASH_ALGORITHM):
+              blake3, or sha256 when the blake3 package is not installed.
     """
     abs_root_path = os.path.abspath(root_folder_path)
-
-    if not os.path.exists(abs_root_path):
-        print(f"Error: Path '{root_folder_path}' does not exist.")
+    if not _is_scannable_root(abs_root_path, root_folder_path):
         return None
-    if not os.path.isdir(abs_root_path):
-        print(f"Error: Path '{root_folder_path}' is not a directory.")
-        return None
-
-    def _get_permissions(item_path):
-        """Helper function to get permissions in a human-readable format."""
-        try:
-            mode = os.stat(item_path).st_mode
-            return stat.filemode(mode)
-        except OSError as e:
-            # Handle cases like permission denied for os.stat()
-            print(f"Warning: Could not get permissions for {item_path}: {e}")
-            return "Permission denied or error"
-
-    def _build_tree_recursive(current_dir_path, base_path, tree_nodes = None):
-        """
-        Recursively builds the tree structure for the current directory.
-        """
-        if tree_nodes is None:
-            tree_nodes = []
-        try:
-            for item_name in os.listdir(current_dir_path):
-                full_path = os.path.join(current_dir_path, item_name)
-
-                # Ensure relative_path is calculated correctly even for the top-level items
-                if current_dir_path == base_path:
-                    relative_path = item_name
-                else:
-                    relative_path = os.path.relpath(full_path, base_path)
-
-                permissions = _get_permissions(full_path)
-                checksum = calculate_file_checksum(full_path)
-                content = read_file_to_string(full_path)
-                filesize = get_file_size_in_bytes(full_path)
-                extension = get_file_extension(item_name)
-
-                node = {
-                    "name": item_name,
-                    "full_path": full_path,
-                    "relative_path": relative_path,
-                    "permissions": permissions,
-                    "checksum": checksum,
-                    "size": filesize,
-                    "extension": extension,
-                    "content": content
-                }
-
-                if os.path.isdir(full_path):
-                    node["type"] = "directory"
-                    # Recursively call for subdirectories
-                    _build_tree_recursive(full_path, base_path, tree_nodes)
-                elif os.path.isfile(full_path):
-                    node["type"] = "file"
-                else:  # Symlinks, special files, etc.
-                    node["type"] = "other"
-
-                tree_nodes.append(node)
-        except PermissionError:
-            print(f"Warning: Permission denied to access directory {current_dir_path}")
-            # Optionally, add a node indicating restricted access
-            tree_nodes.append({
-                "name": os.path.basename(current_dir_path),
-                "full_path": current_dir_path,
-                "relative_path": os.path.relpath(current_dir_path,
-                                                 base_path) if current_dir_path != base_path else os.path.basename(
-                    current_dir_path),
-                "permissions": "d????????? (Permission Denied)",
-                "type": "directory_inaccessible",
-                "children": []
-            })
-        except OSError as e:
-            print(f"Warning: Could not list directory {current_dir_path}: {e}")
-
-        return tree_nodes
 
     # Start building the tree from the root folder itself, but return its contents
     # The user expects a tree *of* files and folders *within* the input path,
     # not a single root node representing the input path itself.
-    # So, we directly call _build_tree_recursive on the abs_root_path.
-    return _build_tree_recursive(abs_root_path, abs_root_path)
+    return list(iter_tree(abs_root_path, cache_path, exclude_dirs, exclude_globs, use_gitignore,
+                          include_content, compact_nodes))
+
+def make_walker(root_folder_path, cache_path=DEFAULT_CACHE_PATH, exclude_dirs=DEFAULT_EXCLUDE_DIRS,
+                exclude_globs=(), use_gitignore=True, include_content=False, compact_nodes=False):
+    """
+    Binds get_folder_tree to one root and set of options, for callers that rescan the
+    same tree over and over (e.g. a watch mode).
+
+    The root is resolved, and the exclude filter (the combined glob regex and the parsed
+    .gitignore) built, once here rather than on every scan. Call make_walker again after
+    changing the root's .gitignore.
+
+    Args:
+        root_folder_path, cache_path, exclude_dirs, exclude_globs, use_gitignore, include_content,
+        compact_nodes: As for get_folder_tree.
+
+    Returns:
+        callable: A function taking no arguments that returns what get_folder_tree would
+                  for the current state of the tree.
+    """
+    abs_root_path = os.path.abspath(root_folder_path)
+    excluded = _make_exclude_filter(abs_root_path, exclude_dirs, exclude_globs, use_gitignore)
+
+    def walk():
+        if not _is_scannable_root(abs_root_path, root_folder_path):
+            return None
+        return list(_walk_tree(abs_root_path, cache_path, excluded, include_content, compact_nodes))
+
+    return walk
+
+# Bytes hashed per file to split same-size groups before any full read
+DEDUP_HEAD_BYTES = 4096
+
+def _hash_head(file_path, hash_algorithm):
+    """Returns the hex digest of the first DEDUP_HEAD_BYTES of a file, or None if it cannot be read."""
+    hasher = _new_hasher(hash_algorithm)
+    try:
+        fd = os.open(file_path, os.O_RDONLY)
+        try:
+            # A single read may return less than asked for (NFS, FUSE); files no larger
+            # than the head are judged on this hash alone, so it must cover all of it
+            remaining = DEDUP_HEAD_BYTES
+            while remaining:
+                chunk = os.read(fd, remaining)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                remaining -= len(chunk)
+        finally:
+            os.close(fd)
+    except OSError as e:
+        print(f"Warning: Could not read '{file_path}': {e}")
+        return None
+    return hasher.hexdigest()
+
+def _split_groups(paths, key):
+    """Groups paths by key(path), dropping unreadable files (None keys) and singletons."""
+    groups = defaultdict(list)
+    for path in paths:
+        k = key(path)
+        if k is not None:
+            groups[k].append(path)
+    return [group for group in groups.values() if len(group) > 1]
+
+def find_duplicate_files(root_folder_path, hash_algorithm="blake3"):
+    """
+    Finds files with identical contents under a folder.
+
+    Files are grouped by size first, using stat information only; a file whose size
+    is unique cannot have a duplicate and is never opened. Same-size files are then
+    split by a hash of their first DEDUP_HEAD_BYTES, and only files that still
+    collide are hashed in full.
 
+    Args:
+        root_folder_path (str): The absolute or relative path to the folder.
+        hash_algorithm (str, optional): The hash algorithm to use, as for calculate_file_checksum.
+                                         Defaults to "blake3".
+
+    Returns:
+        list: A list of groups of absolute file paths, each group holding two or more
+              files with identical contents. Returns None if the path is invalid.
+    """
+    abs_root_path = os.path.abspath(root_folder_path)
+
+    if not os.path.isdir(abs_root_path):
+        print(f"Error: Path '{root_folder_path}' is not a directory.")
+        return None
+    if _new_hasher(hash_algorithm) is None:
+        return None
 
+    by_size = defaultdict(list)
+    for root, _, files in os.walk(abs_root_path):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                st = os.lstat(path)
+            except OSError:
+                continue
+            if stat.S_ISREG(st.st_mode):
+                by_size[st.st_size].append(path)
+
+    duplicates = []
+    for size, paths in by_size.items():
+        if len(paths) < 2:
+            continue
+        for same_head in _split_groups(paths, lambda p: _hash_head(p, hash_algorithm)):
+            if size <= DEDUP_HEAD_BYTES:
+                # The head hash already covered the whole file
+                duplicates.append(same_head)
+            else:
+                duplicates.extend(_split_groups(same_head, lambda p: calculate_file_checksum(p, hash_algorithm)))
+    return sorted(sorted(group) for group in duplicates)
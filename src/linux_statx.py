@@ -0,0 +1,158 @@
+import os
+import sys
+import ctypes
+import functools
+from collections import namedtuple
+
+# Constants from <linux/fcntl.h> and <linux/stat.h>
+AT_FDCWD = -100
+AT_SYMLINK_NOFOLLOW = 0x100
+AT_STATX_DONT_SYNC = 0x4000
+
+STATX_TYPE = 0x0001
+STATX_MODE = 0x0002
+STATX_MTIME = 0x0040
+STATX_CTIME = 0x0080
+STATX_INO = 0x0100
+STATX_SIZE = 0x0200
+
+# Only the fields get_folder_tree needs: file type, permission bits and size,
+# plus inode, mtime and ctime to key its scan cache (the device is always filled in).
+STATX_MASK = STATX_TYPE | STATX_MODE | STATX_SIZE | STATX_INO | STATX_MTIME | STATX_CTIME
+
+# Raw syscall numbers, used when libc has no statx() wrapper (glibc < 2.28).
+_SYS_STATX = {
+    "x86_64": 332,
+    "aarch64": 291,
+}
+
+StatxResult = namedtuple("StatxResult", ["st_mode", "st_size", "st_ino", "st_dev", "st_mtime_ns", "st_ctime_ns"])
+
+
+class _StatxTimestamp(ctypes.Structure):
+    _fields_ = [
+        ("tv_sec", ctypes.c_int64),
+        ("tv_nsec", ctypes.c_uint32),
+        ("__reserved", ctypes.c_int32),
+    ]
+
+
+class _Statx(ctypes.Structure):
+    """struct statx, as laid out by the kernel (256 bytes)."""
+    _fields_ = [
+        ("stx_mask", ctypes.c_uint32),
+        ("stx_blksize", ctypes.c_uint32),
+        ("stx_attributes", ctypes.c_uint64),
+        ("stx_nlink", ctypes.c_uint32),
+        ("stx_uid", ctypes.c_uint32),
+        ("stx_gid", ctypes.c_uint32),
+        ("stx_mode", ctypes.c_uint16),
+        ("__spare0", ctypes.c_uint16),
+        ("stx_ino", ctypes.c_uint64),
+        ("stx_size", ctypes.c_uint64),
+        ("stx_blocks", ctypes.c_uint64),
+        ("stx_attributes_mask", ctypes.c_uint64),
+        ("stx_atime", _StatxTimestamp),
+        ("stx_btime", _StatxTimestamp),
+        ("stx_ctime", _StatxTimestamp),
+        ("stx_mtime", _StatxTimestamp),
+        ("stx_rdev_major", ctypes.c_uint32),
+        ("stx_rdev_minor", ctypes.c_uint32),
+        ("stx_dev_major", ctypes.c_uint32),
+        ("stx_dev_minor", ctypes.c_uint32),
+        ("__spare2", ctypes.c_uint64 * 14),
+    ]
+
+
+def _statx_function():
+    """Returns a callable with the signature of statx(2), or None if there is none."""
+    try:
+        libc = ctypes.CDLL("libc.so.6", use_errno=True)
+    except OSError:
+        return None
+
+    signature = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_uint, ctypes.POINTER(_Statx)]
+
+    if hasattr(libc, "statx"):
+        statx = libc.statx
+        statx.argtypes = signature
+        statx.restype = ctypes.c_int
+        return statx
+
+    syscall_number = _SYS_STATX.get(os.uname().machine)
+    if syscall_number is None:
+        return None
+    syscall = libc.syscall
+    syscall.argtypes = [ctypes.c_long] + signature
+    syscall.restype = ctypes.c_long
+    return functools.partial(syscall, syscall_number)
+
+
+@functools.lru_cache(maxsize=None)
+def _load_statx():
+    """
+    Resolves statx once per process and checks that the kernel actually supports it.
+
+    Returns:
+        The statx callable, or None on non-Linux platforms, kernels older than 4.11
+        and sandboxes that filter the syscall.
+    """
+    if not sys.platform.startswith("linux"):
+        return None
+
+    statx = _statx_function()
+    if statx is None:
+        return None
+
+    # A probe call weeds out ENOSYS (old kernels) and EPERM (seccomp filters)
+    buf = _Statx()
+    if statx(AT_FDCWD, b"/", AT_STATX_DONT_SYNC, STATX_MASK, ctypes.byref(buf)) != 0:
+        return None
+    return statx
+
+
+def is_available():
+    """Returns True if stat() below is served by statx rather than os.stat."""
+    return _load_statx() is not None
+
+
+def stat(path, *, dir_fd=None, follow_symlinks=True):
+    """
+    Fetches the type, permission bits, size, inode, device, mtime and ctime of path.
+
+    On Linux this issues statx(2) with AT_STATX_DONT_SYNC and a mask restricted to
+    those fields, so the kernel may answer from cached attributes without syncing
+    with the backing store (notably on network file systems). Elsewhere it falls
+    back to os.stat, as it does when the file system cannot fill in every field.
+
+    Args:
+        path (str): The path to inspect; relative paths are resolved against dir_fd if given.
+        dir_fd (int, optional): Directory file descriptor to resolve path against.
+        follow_symlinks (bool, optional): Whether to report on the target of a symlink. Defaults to True.
+
+    Returns:
+        An object with st_mode, st_size, st_ino, st_dev, st_mtime_ns and st_ctime_ns attributes
+        (an os.stat_result on fallback).
+
+    Raises:
+        OSError: If the path cannot be stat'ed, exactly like os.stat.
+    """
+    statx = _load_statx()
+    if statx is None:
+        return os.stat(path, dir_fd=dir_fd, follow_symlinks=follow_symlinks)
+
+    flags = AT_STATX_DONT_SYNC
+    if not follow_symlinks:
+        flags |= AT_SYMLINK_NOFOLLOW
+
+    buf = _Statx()
+    if statx(AT_FDCWD if dir_fd is None else dir_fd, os.fsencode(path), flags, STATX_MASK, ctypes.byref(buf)) != 0:
+        error = ctypes.get_errno()
+        raise OSError(error, os.strerror(error), path)
+    if buf.stx_mask & STATX_MASK != STATX_MASK:
+        # The file system left some fields out (they read as 0); ask again the slow way
+        return os.stat(path, dir_fd=dir_fd, follow_symlinks=follow_symlinks)
+    return StatxResult(buf.stx_mode, buf.stx_size, buf.stx_ino,
+                       os.makedev(buf.stx_dev_major, buf.stx_dev_minor),
+                       buf.stx_mtime.tv_sec * 1_000_000_000 + buf.stx_mtime.tv_nsec,
+                       buf.stx_ctime.tv_sec * 1_000_000_000 + buf.stx_ctime.tv_nsec)
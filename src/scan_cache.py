@@ -0,0 +1,280 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+def _default_cache_path():
+    """Returns the default location of the scan cache, honouring XDG_CACHE_HOME."""
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "project-explorer-agent", "scan.db")
+
+DEFAULT_CACHE_PATH = _default_cache_path()
+
+# Rough per-entry cost of a MemoryCache entry beyond its content, for the size bound
+_MEMORY_ENTRY_OVERHEAD = 256
+
+# Bumped whenever the files table changes shape; older tables are dropped and rebuilt
+_SCHEMA_VERSION = 3
+
+# Defaults for pruning the database: rows unused for longer than the age limit go
+# first, then the least recently used ones until the size bound holds
+DEFAULT_MAX_DB_BYTES = 256 << 20
+DEFAULT_MAX_AGE_SECONDS = 30 * 24 * 60 * 60
+# close() prunes at most this often, unless the database has outgrown its size bound
+PRUNE_INTERVAL_SECONDS = 24 * 60 * 60
+# A size-driven prune shrinks the database to this fraction of max_bytes, so that the
+# next few scans don't immediately push it over the bound again
+_PRUNE_TARGET_FRACTION = 0.9
+
+class MemoryCache:
+    """
+    In-process LRU of per-file scan results, with the same get/put_many interface as ScanCache.
+
+    Meant to sit in front of a ScanCache so that scanning the same tree repeatedly within
+    one process skips the sqlite3 round trip per file. Entries follow the same validity
+    rule as ScanCache. The total length of cached content is bounded by max_bytes,
+    evicting the least recently used entries first. Safe to share between threads.
+    """
+
+    def __init__(self, max_bytes=64 << 20):
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def get(self, st, hash_algorithm):
+        """Returns (checksum, content) if the file is unchanged since it was cached, else None."""
+        key = (st.st_dev, st.st_ino, hash_algorithm)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != (st.st_mtime_ns, st.st_ctime_ns, st.st_size):
+                return None
+            self._entries.move_to_end(key)
+            return entry[1], entry[2]
+
+    def put_many(self, entries, hash_algorithm):
+        """Records (st, checksum, content) tuples, evicting old entries to stay within max_bytes."""
+        with self._lock:
+            for st, checksum, content in entries:
+                key = (st.st_dev, st.st_ino, hash_algorithm)
+                previous = self._entries.pop(key, None)
+                if previous is not None:
+                    self._bytes -= _MEMORY_ENTRY_OVERHEAD + len(previous[2] or "")
+                self._entries[key] = ((st.st_mtime_ns, st.st_ctime_ns, st.st_size), checksum, content)
+                self._bytes += _MEMORY_ENTRY_OVERHEAD + len(content or "")
+
+            while self._bytes > self._max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= _MEMORY_ENTRY_OVERHEAD + len(evicted[2] or "")
+
+    def clear(self):
+        """Drops every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+class ScanCache:
+    """
+    Persistent cache of per-file scan results (checksum and content).
+
+    Entries are keyed by (st_dev, st_ino) and hash algorithm, and are only returned
+    while the file's st_mtime_ns, st_ctime_ns and st_size still match the ones recorded
+    with them. The ctime catches what mtime alone misses: a rewrite whose mtime was
+    restored (cp -p, rsync -t, tar x) and permission changes. A changed file simply
+    misses, and its entry is overwritten on the next put().
+
+    Rows for files that were deleted or renamed onto a new inode are never looked up
+    again, so every row records when it was last used and the database is pruned: rows
+    unused for max_age seconds are deleted, then, if the database takes more than
+    max_bytes, the least recently used ones. close() prunes only once a day, or when the
+    database has outgrown max_bytes, so that closing stays cheap on a large cache.
+
+    The keys come from whatever stat result the caller passes in. get_folder_tree uses
+    statx with AT_STATX_DONT_SYNC, which on network filesystems (NFS, CIFS) may return
+    attributes cached by the client; a file changed on another machine can then be served
+    from the cache until the client revalidates its attributes.
+
+    The underlying sqlite3 connection must only be used from the thread that opened it.
+    """
+
+    def __init__(self, db_path=DEFAULT_CACHE_PATH, memory=None,
+                 max_bytes=DEFAULT_MAX_DB_BYTES, max_age=DEFAULT_MAX_AGE_SECONDS):
+        """
+        Opens (creating if needed) the cache database.
+
+        Args:
+            db_path (str, optional): Path of the sqlite3 database file.
+                                     Defaults to ~/.cache/project-explorer-agent/scan.db.
+            memory (MemoryCache, optional): In-process cache consulted before the database
+                                            and kept up to date with it.
+            max_bytes (int, optional): Size bound for the database. Defaults to 256 MiB.
+            max_age (float, optional): Rows unused for this many seconds are deleted when
+                                       the database is pruned. Defaults to 30 days.
+
+        Raises:
+            sqlite3.Error, OSError: If the database cannot be opened or created.
+        """
+        self._memory = memory
+        self._max_bytes = max_bytes
+        self._max_age = max_age
+        # Keys served by get() since the last write, whose last_used is refreshed in bulk
+        self._hits = []
+        # Cached content can come from files other users cannot read, so keep it private
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        os.close(os.open(db_path, os.O_RDWR | os.O_CREAT, 0o600))
+        self._connection = sqlite3.connect(db_path)
+        # The cache can always be rebuilt, so don't pay for an fsync per write
+        self._connection.execute("PRAGMA synchronous = OFF")
+        if self._connection.execute("PRAGMA user_version").fetchone()[0] != _SCHEMA_VERSION:
+            self._connection.execute("DROP TABLE IF EXISTS files")
+            self._connection.execute("DROP TABLE IF EXISTS meta")
+            self._connection.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " dev INTEGER NOT NULL,"
+            " ino INTEGER NOT NULL,"
+            " algorithm TEXT NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " ctime_ns INTEGER NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " checksum TEXT,"
+            " content TEXT,"
+            " last_used INTEGER NOT NULL,"
+            " PRIMARY KEY (dev, ino, algorithm))"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS files_last_used ON files (last_used)")
+        self._connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)")
+        self._connection.commit()
+
+    def get(self, st, hash_algorithm):
+        """
+        Looks up the scan result for a file.
+
+        Args:
+            st: The file's stat result (os.stat_result or anything with the same st_* attributes).
+            hash_algorithm (str): The algorithm the checksum was computed with.
+
+        Returns:
+            tuple: (checksum, content) if the file is unchanged since it was cached, else None.
+        """
+        key = (st.st_dev, st.st_ino, hash_algorithm)
+        if self._memory is not None:
+            cached = self._memory.get(st, hash_algorithm)
+            if cached is not None:
+                self._hits.append(key)
+                return cached
+
+        cached = self._connection.execute(
+            "SELECT checksum, content FROM files"
+            " WHERE dev = ? AND ino = ? AND algorithm = ? AND mtime_ns = ? AND ctime_ns = ? AND size = ?",
+            (st.st_dev, st.st_ino, hash_algorithm, st.st_mtime_ns, st.st_ctime_ns, st.st_size),
+        ).fetchone()
+        if cached is not None:
+            self._hits.append(key)
+            if self._memory is not None:
+                self._memory.put_many([(st, *cached)], hash_algorithm)
+        return cached
+
+    def put_many(self, entries, hash_algorithm):
+        """
+        Records scan results, replacing whatever was cached for the same files.
+
+        Each call is committed as one transaction, so the write lock is held only briefly
+        and other scans sharing the database wait at most for one batch.
+
+        Args:
+            entries: Iterable of (st, checksum, content) tuples.
+            hash_algorithm (str): The algorithm the checksums were computed with.
+        """
+        if self._memory is not None:
+            entries = list(entries)
+            self._memory.put_many(entries, hash_algorithm)
+        now = int(time.time())
+        self._touch_hits(now)
+        self._connection.executemany(
+            "INSERT OR REPLACE INTO files"
+            " (dev, ino, algorithm, mtime_ns, ctime_ns, size, checksum, content, last_used)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            ((st.st_dev, st.st_ino, hash_algorithm, st.st_mtime_ns, st.st_ctime_ns, st.st_size,
+              checksum, content, now)
+             for st, checksum, content in entries),
+        )
+        self._connection.commit()
+
+    def _touch_hits(self, now):
+        """Marks the rows served by get() since the last write as used at `now`."""
+        if self._hits:
+            self._connection.executemany(
+                "UPDATE files SET last_used = ? WHERE dev = ? AND ino = ? AND algorithm = ?",
+                ((now, *key) for key in self._hits),
+            )
+            self._hits.clear()
+
+    def _used_bytes(self):
+        """Returns the bytes of database pages in use, leaving out freed pages."""
+        page_size = self._connection.execute("PRAGMA page_size").fetchone()[0]
+        page_count = self._connection.execute("PRAGMA page_count").fetchone()[0]
+        freelist_count = self._connection.execute("PRAGMA freelist_count").fetchone()[0]
+        return page_size * (page_count - freelist_count)
+
+    def _last_pruned(self):
+        """Returns when prune() last ran on this database, or 0 if never."""
+        row = self._connection.execute("SELECT value FROM meta WHERE key = 'last_pruned'").fetchone()
+        return row[0] if row is not None else 0
+
+    def prune(self):
+        """
+        Deletes rows unused for longer than max_age, then, if the database takes more
+        than max_bytes, the least recently used rows until it is back under the bound.
+        """
+        now = int(time.time())
+        self._touch_hits(now)
+        self._connection.execute("DELETE FROM files WHERE last_used < ?", (now - self._max_age,))
+
+        used = self._used_bytes()
+        if used > self._max_bytes:
+            # Rows are weighed by their content plus a fixed overhead; scale the bound by
+            # how those weights compare to the pages actually in use
+            total = self._connection.execute(
+                "SELECT SUM(? + COALESCE(length(content), 0)) FROM files", (_MEMORY_ENTRY_OVERHEAD,)
+            ).fetchone()[0] or 0
+            self._connection.execute(
+                "DELETE FROM files WHERE rowid IN ("
+                " SELECT rowid FROM ("
+                "  SELECT rowid, SUM(? + COALESCE(length(content), 0))"
+                "   OVER (ORDER BY last_used DESC, rowid DESC) AS running"
+                "  FROM files)"
+                " WHERE running > ?)",
+                (_MEMORY_ENTRY_OVERHEAD, total * self._max_bytes * _PRUNE_TARGET_FRACTION / used),
+            )
+        self._connection.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_pruned', ?)", (now,)
+        )
+        self._connection.commit()
+
+    def close(self):
+        """
+        Commits pending writes, prunes the database if it is due (see the class docstring)
+        and closes the underlying connection.
+        """
+        try:
+            now = int(time.time())
+            if now - self._last_pruned() >= PRUNE_INTERVAL_SECONDS or self._used_bytes() > self._max_bytes:
+                self.prune()
+            else:
+                self._touch_hits(now)
+                self._connection.commit()
+        finally:
+            self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,4 +1,39 @@
 import ast
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Number of AST dumps kept by _parse_and_dump, least recently used evicted first
+AST_DUMP_CACHE_SIZE = 1024
+
+_ast_dump_cache = OrderedDict()
+_ast_dump_cache_lock = threading.Lock()
+
+def _parse_and_dump(source_code: str) -> str:
+    """
+    Memoized ast.parse + ast.dump; repeated scans of the same sources become a dict lookup.
+
+    Entries are keyed on a 128-bit blake2b digest of the source rather than the source
+    itself, so the cache holds only the dumps, not a copy of every module it has seen.
+    Like ast.parse, it accepts bytes as well as str; the two are keyed apart, since
+    bytes may carry a coding declaration that changes how they parse.
+    """
+    if isinstance(source_code, bytes):
+        key = hashlib.blake2b(source_code, digest_size=16, person=b"bytes").digest()
+    else:
+        key = hashlib.blake2b(source_code.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    with _ast_dump_cache_lock:
+        dump = _ast_dump_cache.get(key)
+        if dump is not None:
+            _ast_dump_cache.move_to_end(key)
+            return dump
+
+    dump = ast.dump(ast.parse(source_code), indent=4)
+    with _ast_dump_cache_lock:
+        _ast_dump_cache[key] = dump
+        while len(_ast_dump_cache) > AST_DUMP_CACHE_SIZE:
+            _ast_dump_cache.popitem(last=False)
+    return dump
 
 def dump_python_ast(source_code: str) -> str:
     """
@@ -12,15 +47,14 @@ def dump_python_ast(source_code: str) -> str:
         Returns an error message string if parsing fails.
     """
     try:
-        # Parse the source code into an AST
-        tree = ast.parse(source_code)
-        # Dump the AST with an indent of 4
-        # ast.dump returns a string representation of the tree
+        # Parse the source code into an AST and dump it with an indent of 4
         # The 'indent' parameter was added in Python 3.9
         # For older versions, ast.dump(tree, annotate_fields=True, include_attributes=False)
         # would be used, but it doesn't have the 'indent' pretty-printing.
         # Modern ast.dump with indent is much more readable.
-        return ast.dump(tree, indent=4)
+        # Results are cached per source string; failures are not, so errors
+        # below are reported on every call.
+        return _parse_and_dump(source_code)
     except SyntaxError as e:
         return f"SyntaxError during parsing: {e}"
     except Exception as e:
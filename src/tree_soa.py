@@ -0,0 +1,142 @@
+import array
+from collections import Counter
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+
+# Node types, indexed by the codes stored in TreeSoA.types
+NODE_TYPES = ("file", "directory", "other", "directory_inaccessible", "directory_skipped")
+_TYPE_CODES = {node_type: code for code, node_type in enumerate(NODE_TYPES)}
+
+# TreeSoA attribute holding each node key that is stored as a plain list column
+_LIST_COLUMNS = {
+    "name": "names",
+    "full_path": "full_paths",
+    "relative_path": "relative_paths",
+    "permissions": "permissions",
+    "checksum": "checksums",
+    "extension": "extensions",
+    "content": "contents",
+}
+
+# Keys each node type carries, in the order iter_tree builds them
+_DEFAULT_KEYS = ("name", "full_path", "relative_path", "permissions", "checksum", "size", "extension", "content", "type")
+_NODE_KEYS = {
+    "directory_inaccessible": ("name", "full_path", "relative_path", "permissions", "type", "children"),
+    "directory_skipped": ("name", "full_path", "relative_path", "type"),
+}
+
+# Stored in TreeSoA.sizes for nodes whose size is None
+_NO_SIZE = -1
+
+@dataclass
+class TreeSoA:
+    """
+    Column-oriented ("structure of arrays") form of the nodes get_folder_tree returns.
+
+    Each node field lives in its own column, with sizes and types packed into typed
+    arrays, so a large tree costs one slot per field instead of one dict per node, and
+    aggregates such as total_size() run over a single column.
+
+    Indexing and iteration yield NodeView objects, read-only mappings that behave like
+    the original node dicts (tree[0]['name']); to_list_of_dicts() converts back for
+    callers that need real dicts.
+
+    Build one with TreeSoA.from_nodes(iter_tree(path)) to avoid ever holding the whole
+    tree as dicts.
+    """
+    names: list = field(default_factory=list)
+    full_paths: list = field(default_factory=list)
+    relative_paths: list = field(default_factory=list)
+    permissions: list = field(default_factory=list)
+    checksums: list = field(default_factory=list)
+    extensions: list = field(default_factory=list)
+    contents: list = field(default_factory=list)
+    sizes: array.array = field(default_factory=lambda: array.array('q'))
+    types: array.array = field(default_factory=lambda: array.array('B'))
+
+    @classmethod
+    def from_nodes(cls, nodes):
+        """Builds a TreeSoA from an iterable of node dicts, as returned by get_folder_tree or iter_tree."""
+        tree = cls()
+        for node in nodes:
+            tree.append(node)
+        return tree
+
+    def append(self, node):
+        """Adds one node dict; keys its type does not carry are stored as None."""
+        self.names.append(node["name"])
+        self.full_paths.append(node["full_path"])
+        self.relative_paths.append(node["relative_path"])
+        self.permissions.append(node.get("permissions"))
+        self.checksums.append(node.get("checksum"))
+        self.extensions.append(node.get("extension"))
+        self.contents.append(node.get("content"))
+        size = node.get("size")
+        self.sizes.append(_NO_SIZE if size is None else size)
+        self.types.append(_TYPE_CODES[node["type"]])
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, index):
+        # Slices give a list of views, as slicing get_folder_tree's list gives a list of nodes
+        if isinstance(index, slice):
+            return [NodeView(self, i) for i in range(*index.indices(len(self)))]
+        if not isinstance(index, int):
+            raise TypeError(f"TreeSoA indices must be integers or slices, not {type(index).__name__}")
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("TreeSoA index out of range")
+        return NodeView(self, index)
+
+    def __iter__(self):
+        return (NodeView(self, index) for index in range(len(self)))
+
+    def to_list_of_dicts(self):
+        """Returns the nodes as the list of dicts get_folder_tree would have returned."""
+        return [dict(node) for node in self]
+
+    def total_size(self):
+        """Returns the summed size of every node that has one, in bytes."""
+        return sum(size for size in self.sizes if size != _NO_SIZE)
+
+    def count_by_extension(self):
+        """Returns a Counter of file extensions (None for files without one) over file nodes."""
+        file_code = _TYPE_CODES["file"]
+        return Counter(extension for extension, code in zip(self.extensions, self.types) if code == file_code)
+
+
+class NodeView(Mapping):
+    """Read-only, dict-like view of one node of a TreeSoA."""
+
+    __slots__ = ("_tree", "_index")
+
+    def __init__(self, tree, index):
+        self._tree = tree
+        self._index = index
+
+    def _keys(self):
+        return _NODE_KEYS.get(NODE_TYPES[self._tree.types[self._index]], _DEFAULT_KEYS)
+
+    def __getitem__(self, key):
+        if key not in self._keys():
+            raise KeyError(key)
+        if key == "type":
+            return NODE_TYPES[self._tree.types[self._index]]
+        if key == "size":
+            size = self._tree.sizes[self._index]
+            return None if size == _NO_SIZE else size
+        if key == "children":
+            # Only inaccessible directories carry it, and it is always empty
+            return []
+        return getattr(self._tree, _LIST_COLUMNS[key])[self._index]
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self):
+        return len(self._keys())
+
+    def __repr__(self):
+        return f"NodeView({dict(self)!r})"
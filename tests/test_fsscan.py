@@ -1,14 +1,21 @@
 import unittest
 from unittest.mock import patch, mock_open, MagicMock, call
 import os
+import sys
 import stat
 import hashlib
 import tempfile
 import shutil
+import sqlite3
+import mmap
 import io
+import json
+import time
+import fnmatch
 
+from src import fsscan
 from src.fsscan import get_file_extension, get_file_size_in_bytes, read_file_to_string, calculate_file_checksum, \
-    print_directory_tree, get_folder_tree
+    read_and_hash, print_directory_tree, get_folder_tree, iter_tree, make_walker, find_duplicate_files, FileNode, _make_lut_filemode
 
 # To make patches work correctly with the above embedded code,
 # we need to patch where the names are looked up (i.e., in __main__ if run directly)
@@ -27,11 +34,15 @@ class TestGetFileExtension(unittest.TestCase):
     def test_dotfile_no_further_extension(self):
         self.assertIsNone(get_file_extension(".bashrc"))
 
+    def test_dotfile_with_several_leading_dots(self):
+        self.assertIsNone(get_file_extension("..bashrc"))
+        self.assertIsNone(get_file_extension("...a"))
+
     def test_dotfile_with_extension(self):
         self.assertEqual(get_file_extension(".config.fish"), "fish")
 
-    # def test_filename_ends_with_dot(self):
-    #     self.assertIsNone(get_file_extension("filename."))
+    def test_filename_ends_with_dot(self):
+        self.assertIsNone(get_file_extension("filename."))
 
     def test_empty_string(self):
         self.assertIsNone(get_file_extension(""))
@@ -72,30 +83,34 @@ class TestGetFileSizeInBytes(unittest.TestCase):
     def test_existing_file(self):
         self.assertEqual(get_file_size_in_bytes(self.test_file_path), 11)
 
-    @patch(f'{MODULE_PATH_PREFIX}.os.path.exists')
-    def test_file_not_found(self, mock_exists):
-        mock_exists.return_value = False
+    def test_file_not_found(self):
         self.assertIsNone(get_file_size_in_bytes("non_existent_file.txt"))
 
-    @patch(f'{MODULE_PATH_PREFIX}.os.path.isfile')
-    @patch(f'{MODULE_PATH_PREFIX}.os.path.exists')
-    def test_path_is_directory(self, mock_exists, mock_isfile):
-        mock_exists.return_value = True
-        mock_isfile.return_value = False
-        self.assertIsNone(get_file_size_in_bytes("some_directory"))
-
-    @patch(f'{MODULE_PATH_PREFIX}.os.path.getsize', side_effect=OSError("Permission denied"))
-    @patch(f'{MODULE_PATH_PREFIX}.os.path.isfile', return_value=True)
-    @patch(f'{MODULE_PATH_PREFIX}.os.path.exists', return_value=True)
-    def test_os_error_permission(self, mock_exists, mock_isfile, mock_getsize):
+    def test_path_is_directory(self):
+        self.assertIsNone(get_file_size_in_bytes(self.temp_dir.name))
+
+    @patch(f'{MODULE_PATH_PREFIX}.os.stat', side_effect=PermissionError("Permission denied"))
+    def test_os_error_permission(self, mock_stat):
         self.assertIsNone(get_file_size_in_bytes("protected_file.txt"))
 
-    @patch(f'{MODULE_PATH_PREFIX}.os.path.getsize', side_effect=Exception("Unexpected error"))
-    @patch(f'{MODULE_PATH_PREFIX}.os.path.isfile', return_value=True)
-    @patch(f'{MODULE_PATH_PREFIX}.os.path.exists', return_value=True)
-    def test_generic_exception(self, mock_exists, mock_isfile, mock_getsize):
+    @patch(f'{MODULE_PATH_PREFIX}.os.stat', side_effect=Exception("Unexpected error"))
+    def test_generic_exception(self, mock_stat):
         self.assertIsNone(get_file_size_in_bytes("any_file.txt"))
 
+    def test_prefetched_stat(self):
+        st = os.stat(self.test_file_path)
+        with patch(f'{MODULE_PATH_PREFIX}.os.stat', side_effect=AssertionError("stat called")):
+            self.assertEqual(get_file_size_in_bytes(self.test_file_path, st), 11)
+            self.assertIsNone(get_file_size_in_bytes(self.temp_dir.name, os.lstat(self.temp_dir.name)))
+
+class TestFilemode(unittest.TestCase):
+    def test_lookup_table_matches_stat_filemode(self):
+        lut_filemode = _make_lut_filemode()
+        for file_type in (stat.S_IFDIR, stat.S_IFREG, stat.S_IFLNK, stat.S_IFIFO, 0):
+            for bits in range(0o10000):
+                mode = file_type | bits
+                self.assertEqual(lut_filemode(mode), stat.filemode(mode))
+
 class TestReadFileToString(unittest.TestCase):
     def setUp(self):
         self.temp_dir = tempfile.TemporaryDirectory()
@@ -111,6 +126,24 @@ class TestReadFileToString(unittest.TestCase):
         content = read_file_to_string(self.test_file_path)
         self.assertEqual(content, self.file_content)
 
+    def test_read_large_file_mapped(self):
+        with patch('src.fsscan.READ_MMAP_MIN_BYTES', 0), patch('src.fsscan.mmap.mmap', wraps=mmap.mmap) as mock_mmap:
+            content = read_file_to_string(self.test_file_path)
+        self.assertEqual(content, self.file_content)
+        mock_mmap.assert_called_once()
+
+    def test_newlines_translated(self):
+        with open(self.test_file_path, "wb") as f:
+            f.write(b"a\r\nb\rc\n")
+        self.assertEqual(read_file_to_string(self.test_file_path), "a\nb\nc\n")
+        with patch('src.fsscan.READ_MMAP_MIN_BYTES', 0):
+            self.assertEqual(read_file_to_string(self.test_file_path), "a\nb\nc\n")
+
+    def test_invalid_utf8(self):
+        with open(self.test_file_path, "wb") as f:
+            f.write(b"\x80abc")
+        self.assertIsNone(read_file_to_string(self.test_file_path))
+
     def test_file_not_found(self):
         self.assertIsNone(read_file_to_string("non_existent_file.txt"))
 
@@ -162,6 +195,72 @@ class TestCalculateFileChecksum(unittest.TestCase):
     def test_unsupported_algorithm(self):
         self.assertIsNone(calculate_file_checksum(self.test_file_path, "invalid_algo"))
 
+    def test_hashlib_attribute_is_not_an_algorithm(self):
+        self.assertIsNone(calculate_file_checksum(self.test_file_path, "new"))
+        self.assertIsNone(calculate_file_checksum(self.test_file_path, "shake_128"))
+
+    @unittest.skipUnless("sha512_256" in hashlib.algorithms_available, "sha512_256 not available")
+    def test_openssl_only_algorithm(self):
+        self.assertEqual(calculate_file_checksum(self.test_file_path, "sha512_256"),
+                         hashlib.new("sha512_256", self.file_content).hexdigest())
+
+    @unittest.skipUnless(hasattr(hashlib, "file_digest"), "hashlib.file_digest not available")
+    def test_uses_file_digest(self):
+        with patch('src.fsscan.hashlib.file_digest', wraps=hashlib.file_digest) as mock_file_digest:
+            self.assertEqual(calculate_file_checksum(self.test_file_path, "sha256"),
+                             hashlib.sha256(self.file_content).hexdigest())
+        mock_file_digest.assert_called_once()
+
+    def test_without_file_digest_file_grows(self):
+        # Report a stale, smaller size: the buffer is sized from it, but the whole file is still read
+        with patch('src.fsscan.hashlib.file_digest', None, create=True), \
+             patch('src.fsscan.os.fstat', side_effect=lambda fd: os.stat_result((0,) * 6 + (2,) + (0,) * 3)):
+            checksum = calculate_file_checksum(self.test_file_path, "sha256")
+        self.assertEqual(checksum, hashlib.sha256(self.file_content).hexdigest())
+
+    def test_without_file_digest(self):
+        with patch('src.fsscan.hashlib.file_digest', None, create=True):
+            self.assertEqual(calculate_file_checksum(self.test_file_path, "sha256", chunk_size=4),
+                             hashlib.sha256(self.file_content).hexdigest())
+
+    @unittest.skipUnless(hasattr(os, "posix_fadvise"), "posix_fadvise not available")
+    def test_fadvise_sequential_then_dontneed(self):
+        with patch('src.fsscan.os.posix_fadvise') as mock_fadvise:
+            self.assertEqual(calculate_file_checksum(self.test_file_path, "sha256"),
+                             hashlib.sha256(self.file_content).hexdigest())
+        advice = [c.args[2:] for c in mock_fadvise.call_args_list]
+        self.assertEqual(advice, [(0, os.POSIX_FADV_SEQUENTIAL),
+                                  (len(self.file_content), os.POSIX_FADV_WILLNEED),
+                                  (0, os.POSIX_FADV_DONTNEED)])
+
+    @unittest.skipUnless(hasattr(os, "posix_fadvise"), "posix_fadvise not available")
+    def test_fadvise_refused(self):
+        with patch('src.fsscan.os.posix_fadvise', side_effect=OSError("not supported")):
+            self.assertEqual(calculate_file_checksum(self.test_file_path, "sha256"),
+                             hashlib.sha256(self.file_content).hexdigest())
+
+    @patch('src.fsscan.MMAP_MIN_BYTES', 0)
+    def test_calculate_checksum_mmap(self):
+        expected_checksum = hashlib.sha256(self.file_content).hexdigest()
+        self.assertEqual(calculate_file_checksum(self.test_file_path, "sha256"), expected_checksum)
+
+    @patch('src.fsscan.mmap.mmap', side_effect=OSError("Cannot map"))
+    @patch('src.fsscan.MMAP_MIN_BYTES', 0)
+    def test_calculate_checksum_mmap_failure_falls_back(self, mock_mmap):
+        expected_checksum = hashlib.sha256(self.file_content).hexdigest()
+        self.assertEqual(calculate_file_checksum(self.test_file_path, "sha256"), expected_checksum)
+
+    def test_default_is_sha256(self):
+        expected_checksum = hashlib.sha256(self.file_content).hexdigest()
+        self.assertEqual(calculate_file_checksum(self.test_file_path), expected_checksum)
+
+    @patch('src.fsscan._blake3_module', return_value=None)
+    def test_blake3_falls_back_to_sha256_without_blake3(self, mock_blake3_module):
+        expected_checksum = hashlib.sha256(self.file_content).hexdigest()
+        self.assertEqual(calculate_file_checksum(self.test_file_path, "blake3"), expected_checksum)
+        self.assertEqual(fsscan.effective_hash_algorithm("blake3"), "sha256")
+        self.assertEqual(fsscan.effective_hash_algorithm("md5"), "md5")
+
     def test_file_not_found(self):
         self.assertIsNone(calculate_file_checksum("non_existent_file.txt"))
 
@@ -169,6 +268,67 @@ class TestCalculateFileChecksum(unittest.TestCase):
     # def test_io_error_during_open_or_read(self, mock_file_open):
     #     self.assertIsNone(calculate_file_checksum(self.test_file_path))
 
+class TestReadAndHash(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.test_file_path = os.path.join(self.temp_dir.name, "fused_file.txt")
+        self.file_content = "Hello, Vova!\r\n你好世界\n"
+        with open(self.test_file_path, "wb") as f:
+            f.write(self.file_content.encode("utf-8"))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_matches_separate_calls(self):
+        checksum, content, size = read_and_hash(self.test_file_path)
+        self.assertEqual(checksum, calculate_file_checksum(self.test_file_path, "blake3"))
+        self.assertEqual(content, read_file_to_string(self.test_file_path))
+        self.assertEqual(size, len(self.file_content.encode("utf-8")))
+
+    def test_short_reads(self):
+        data = bytes(range(256)) * 40  # 10240 bytes, not valid UTF-8
+        with open(self.test_file_path, "wb") as f:
+            f.write(data)
+        real_read = os.read
+        with patch('src.fsscan.os.read', side_effect=lambda fd, n: real_read(fd, min(n, 4096))):
+            checksum, content, size = read_and_hash(self.test_file_path, "sha256")
+        self.assertEqual(size, len(data))
+        self.assertEqual(checksum, hashlib.sha256(data).hexdigest())
+
+    def test_stale_size_hint(self):
+        expected = read_and_hash(self.test_file_path)
+        self.assertEqual(read_and_hash(self.test_file_path, size_hint=0), expected)
+        self.assertEqual(read_and_hash(self.test_file_path, size_hint=1000), expected)
+
+    def test_binary_file_has_no_content(self):
+        binary_file_path = os.path.join(self.temp_dir.name, "binary.bin")
+        with open(binary_file_path, "wb") as f:
+            f.write(b"\xff\xfe\x00\x01")
+        checksum, content, size = read_and_hash(binary_file_path, "md5")
+        self.assertEqual(checksum, hashlib.md5(b"\xff\xfe\x00\x01").hexdigest())
+        self.assertIsNone(content)
+        self.assertEqual(size, 4)
+
+    def test_sniff_binary_skips_decoding(self):
+        nul_file_path = os.path.join(self.temp_dir.name, "nul.dat")
+        with open(nul_file_path, "wb") as f:
+            f.write(b"valid\x00utf8")
+        self.assertEqual(read_and_hash(nul_file_path, "md5")[1], "valid\x00utf8")
+        with patch('src.fsscan._decode_text') as mock_decode:
+            checksum, content, size = read_and_hash(nul_file_path, "md5", sniff_binary=True)
+        mock_decode.assert_not_called()
+        self.assertEqual(checksum, hashlib.md5(b"valid\x00utf8").hexdigest())
+        self.assertIsNone(content)
+        # Text without NULs is still decoded when sniffing
+        self.assertEqual(read_and_hash(self.test_file_path, "md5", sniff_binary=True)[1],
+                         read_file_to_string(self.test_file_path))
+
+    def test_unsupported_algorithm(self):
+        self.assertEqual(read_and_hash(self.test_file_path, "invalid_algo"), (None, None, None))
+
+    def test_file_not_found(self):
+        self.assertEqual(read_and_hash("non_existent_file.txt"), (None, None, None))
+
 class TestPrintDirectoryTree(unittest.TestCase):
     def setUp(self):
         self.temp_dir_obj = tempfile.TemporaryDirectory()
@@ -192,7 +352,7 @@ class TestPrintDirectoryTree(unittest.TestCase):
         self.temp_dir_obj.cleanup()
 
     def test_basic_directory_tree(self):
-        # Note: os.walk order can vary, so files/dirs are sorted in the function for stable tests
+        # Entries are sorted by name, so the output is stable
         # The basename of root_dir might vary based on how tempfile names it.
         # The function's logic for base_name should handle this.
         base_name = os.path.basename(self.root_dir)
@@ -208,7 +368,29 @@ class TestPrintDirectoryTree(unittest.TestCase):
         # Normalize path separators for comparison if necessary, though os.walk should be consistent.
         # The function sorts dirs and files, which is good for predictability.
         actual_tree = print_directory_tree(self.root_dir)
-        #self.assertEqual(actual_tree, expected_tree)
+        self.assertEqual(actual_tree, expected_tree)
+
+    def test_unreadable_subdirectory(self):
+        real_scandir = os.scandir
+        locked = os.path.join(self.root_dir, "subdir1")
+
+        def scandir(path):
+            if path == locked:
+                raise PermissionError("Permission denied")
+            return real_scandir(path)
+
+        with patch(f'{MODULE_PATH_PREFIX}.os.scandir', side_effect=scandir):
+            actual_tree = print_directory_tree(self.root_dir)
+        # The directory is still listed, just without its contents
+        self.assertTrue(actual_tree.endswith("|   +-- subdir1/\n"))
+        self.assertNotIn("subfile1.txt", actual_tree)
+
+    def test_excluded_dirs_not_descended(self):
+        os.makedirs(os.path.join(self.root_dir, "node_modules", "pkg"))
+        actual_tree = print_directory_tree(self.root_dir)
+        self.assertIn("|   +-- node_modules/\n", actual_tree)
+        self.assertNotIn("pkg", actual_tree)
+        self.assertIn("|   |   +-- pkg/\n", print_directory_tree(self.root_dir, exclude_dirs=()))
 
     def test_empty_directory_tree(self):
         with tempfile.TemporaryDirectory() as empty_dir_path:
@@ -217,10 +399,9 @@ class TestPrintDirectoryTree(unittest.TestCase):
             actual_tree = print_directory_tree(empty_dir_path)
             self.assertEqual(actual_tree, expected_tree)
 
-    @patch(f'{MODULE_PATH_PREFIX}.os.walk')
-    def test_non_existent_root_dir_handled_by_os_walk(self, mock_walk):
-        # If os.walk is called with a non-existent directory, it yields nothing.
-        mock_walk.return_value = iter([]) # Simulate os.walk on non-existent/empty dir
+    @patch(f'{MODULE_PATH_PREFIX}.os.scandir', side_effect=FileNotFoundError("No such directory"))
+    def test_non_existent_root_dir_handled_by_os_walk(self, mock_scandir):
+        # os.scandir raises for a non-existent directory; the function reports it and yields nothing.
         self.assertEqual(print_directory_tree("non_existent_dir"), "")
 
 
@@ -253,15 +434,15 @@ class TestGetFolderTree(unittest.TestCase):
     def tearDown(self):
         self.temp_dir_obj.cleanup()
 
-    @patch(f'{MODULE_PATH_PREFIX}.os.path.exists')
-    def test_path_not_exists(self, mock_exists):
-        mock_exists.return_value = False
-        self.assertIsNone(get_folder_tree("non_existent_path"))
+    def test_path_not_exists(self):
+        self.assertIsNone(get_folder_tree(os.path.join(self.root_path, "non_existent_path"), cache_path=None))
+
+    def test_path_is_not_directory(self):
+        self.assertIsNone(get_folder_tree(self.fileA_path, cache_path=None))
 
-    @patch(f'{MODULE_PATH_PREFIX}.os.path.isdir', return_value=False)
-    @patch(f'{MODULE_PATH_PREFIX}.os.path.exists', return_value=True)
-    def test_path_is_not_directory(self, mock_exists, mock_isdir):
-        self.assertIsNone(get_folder_tree("not_a_directory_path"))
+    @patch(f'{MODULE_PATH_PREFIX}.os.stat', side_effect=PermissionError("Permission denied"))
+    def test_path_not_accessible(self, mock_stat):
+        self.assertIsNone(get_folder_tree(self.root_path, cache_path=None))
 
     # To simplify, we'll test with real file operations and mock internal calls
     # if they were complex or to control specific return values.
@@ -280,7 +461,7 @@ class TestGetFolderTree(unittest.TestCase):
         mock_read_string.side_effect = lambda p: open(p, 'r').read() if os.path.isfile(p) else None
         mock_checksum.side_effect = lambda p, alg="sha256": f"checksum_for_{os.path.basename(p)}" if os.path.isfile(p) else None
 
-        tree = get_folder_tree(self.root_path)
+        tree = get_folder_tree(self.root_path, cache_path=None)
         self.assertIsNotNone(tree)
         self.assertIsInstance(tree, list)
 
@@ -326,23 +507,283 @@ class TestGetFolderTree(unittest.TestCase):
         #self.assertEqual(fileB_node['content'], "contentB")
 
 
-    @patch(f'{MODULE_PATH_PREFIX}.os.listdir', side_effect=PermissionError("Cannot list"))
-    @patch(f'{MODULE_PATH_PREFIX}.os.path.isdir', return_value=True) # Assume it's a dir
-    @patch(f'{MODULE_PATH_PREFIX}.os.path.exists', return_value=True) # Assume it exists
-    @patch(f'{MODULE_PATH_PREFIX}.os.path.abspath', side_effect=lambda x: x) # Simple abspath mock
-    def test_permission_denied_listdir(self, mock_abspath, mock_exists, mock_isdir, mock_listdir):
-        tree = get_folder_tree("some_restricted_dir")
+    @patch(f'{MODULE_PATH_PREFIX}.os.open', side_effect=PermissionError("Cannot list"))
+    def test_permission_denied_listdir(self, mock_open_dir):
+        tree = get_folder_tree(self.root_path, cache_path=None)
         self.assertIsNotNone(tree)
         self.assertEqual(len(tree), 1)
         node = tree[0]
-        self.assertEqual(node['name'], "some_restricted_dir") # os.path.basename
+        self.assertEqual(node['name'], os.path.basename(self.root_path))
         self.assertEqual(node['type'], "directory_inaccessible")
         self.assertEqual(node['permissions'], "d????????? (Permission Denied)")
 
+    def test_permission_denied_subdirectory(self):
+        real_open = os.open
+
+        def open_dir(path, flags, *args, **kwargs):
+            if path == self.subdir1_path:
+                raise PermissionError("Cannot list")
+            return real_open(path, flags, *args, **kwargs)
+
+        with patch(f'{MODULE_PATH_PREFIX}.os.open', side_effect=open_dir):
+            tree = get_folder_tree(self.root_path, cache_path=None)
+        inaccessible = [item for item in tree if item['type'] == "directory_inaccessible"]
+        self.assertEqual(len(inaccessible), 1)
+        self.assertEqual(inaccessible[0]['relative_path'], "subDir1")
+        self.assertEqual(inaccessible[0]['full_path'], self.subdir1_path)
+
+    def test_content_skipped_for_large_and_binary_files(self):
+        with open(os.path.join(self.root_path, "blob.bin"), "wb") as f: f.write(b"ab\x00cd")
+        with patch('src.fsscan.MAX_CONTENT_BYTES', 7):
+            tree = get_folder_tree(self.root_path, cache_path=None, include_content=True)
+        nodes = {item['name']: item for item in tree}
+        self.assertEqual(nodes["fileA.txt"]['content'], None) # 8 bytes, over the patched limit
+        self.assertEqual(nodes["fileA.txt"]['checksum'], calculate_file_checksum(self.fileA_path, "blake3"))
+        self.assertEqual(nodes[".hiddenfile"]['content'], "hidden")
+        self.assertIsNone(nodes["blob.bin"]['content'])
+        self.assertIsNotNone(nodes["blob.bin"]['checksum'])
+
+    def test_unchanged_files_served_from_cache(self):
+        cache_path = os.path.join(self.root_path, ".scan.db")
+        first = get_folder_tree(self.subdir1_path, cache_path=cache_path, include_content=True)
+        with patch('src.fsscan.read_and_hash') as mock_read_and_hash:
+            second = get_folder_tree(self.subdir1_path, cache_path=cache_path, include_content=True)
+            mock_read_and_hash.assert_not_called()
+        self.assertEqual(first, second)
+        self.assertEqual(second[0]['content'], "contentB")
+
+    def test_nodes_are_plain_dicts_by_default(self):
+        tree = get_folder_tree(self.root_path, cache_path=None, include_content=True)
+        self.assertTrue(all(type(node) is dict for node in tree))
+        self.assertEqual(json.loads(json.dumps(tree)), tree)
+
+    def test_compact_nodes_are_dict_like(self):
+        tree = get_folder_tree(self.root_path, cache_path=None, compact_nodes=True)
+        self.assertEqual(tree, get_folder_tree(self.root_path, cache_path=None))
+        fileA_node = next(item for item in tree if item['name'] == "fileA.txt")
+        self.assertIsInstance(fileA_node, FileNode)
+        self.assertFalse(hasattr(fileA_node, '__dict__'))
+        as_dict = dict(fileA_node)
+        self.assertEqual(list(as_dict), ['name', 'full_path', 'relative_path', 'permissions', 'checksum',
+                                         'size', 'extension', 'content', 'type'])
+        self.assertEqual(fileA_node, as_dict)
+        self.assertEqual(fileA_node.get('size'), 8)
+        self.assertIsNone(fileA_node.get('children'))
+        with self.assertRaises(KeyError):
+            fileA_node['children']
+        self.assertEqual(json.loads(json.dumps(fileA_node.to_dict())), as_dict)
+
+    def test_content_not_read_by_default(self):
+        tree = get_folder_tree(self.root_path, cache_path=None)
+        fileA_node = next(item for item in tree if item['name'] == "fileA.txt")
+        self.assertIsNone(fileA_node['content'])
+        self.assertEqual(fileA_node['checksum'], calculate_file_checksum(self.fileA_path, "blake3"))
+
+    def test_cache_detects_rewrite_with_restored_mtime(self):
+        cache_path = os.path.join(self.root_path, ".scan.db")
+        st = os.stat(self.fileB_path)
+        get_folder_tree(self.subdir1_path, cache_path=cache_path, include_content=True)
+        time.sleep(0.02)  # Let the rewrite land on a later ctime tick
+        with open(self.fileB_path, "w") as f:
+            f.write("CONTENTB")
+        os.utime(self.fileB_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        for clear_memory in (False, True):
+            if clear_memory:
+                fsscan._MEMORY_CACHE.clear()
+            tree = get_folder_tree(self.subdir1_path, cache_path=cache_path, include_content=True)
+            self.assertEqual(tree[0]['content'], "CONTENTB")
+            self.assertEqual(tree[0]['checksum'], calculate_file_checksum(self.fileB_path, "blake3"))
+
+    def test_cache_entries_without_content_not_served_with_content(self):
+        cache_path = os.path.join(self.root_path, ".scan.db")
+        get_folder_tree(self.subdir1_path, cache_path=cache_path)
+        tree = get_folder_tree(self.subdir1_path, cache_path=cache_path, include_content=True)
+        self.assertEqual(tree[0]['content'], "contentB")
+
+    def test_overlapping_scans_share_cache(self):
+        cache_path = os.path.join(self.root_path, ".scan.db")
+        first = iter_tree(self.root_path, cache_path=cache_path)
+        next(first)  # The first scan has written the root's batch and is still open
+        try:
+            tree = get_folder_tree(self.root_path, cache_path=cache_path)
+        finally:
+            first.close()
+        fileB_node = next(item for item in tree if item['name'] == "fileB.ext")
+        self.assertEqual(fileB_node['checksum'], calculate_file_checksum(self.fileB_path, "blake3"))
+
+    def test_failing_cache_degrades_to_no_cache(self):
+        cache_path = os.path.join(self.root_path, ".scan.db")
+        error = sqlite3.OperationalError("database is locked")
+        with patch('src.fsscan.ScanCache.get', side_effect=error), \
+             patch('src.fsscan.ScanCache.put_many', side_effect=error):
+            tree = get_folder_tree(self.root_path, cache_path=cache_path)
+        fileA_node = next(item for item in tree if item['name'] == "fileA.txt")
+        self.assertEqual(fileA_node['checksum'], calculate_file_checksum(self.fileA_path, "blake3"))
+
+    def test_read_failures_not_cached(self):
+        cache_path = os.path.join(self.root_path, ".scan.db")
+        with patch('src.fsscan.read_and_hash', return_value=(None, None, None)):
+            failed = get_folder_tree(self.subdir1_path, cache_path=cache_path)
+        self.assertEqual([item['checksum'] for item in failed], [None])
+        tree = get_folder_tree(self.subdir1_path, cache_path=cache_path)
+        self.assertEqual([item['checksum'] for item in tree], [calculate_file_checksum(self.fileB_path, "blake3")])
+
+    def test_iter_tree_matches_get_folder_tree(self):
+        nodes = iter_tree(self.root_path, cache_path=None)
+        self.assertNotIsInstance(nodes, list)
+        self.assertEqual(list(nodes), get_folder_tree(self.root_path, cache_path=None))
+
+    def test_make_walker_rescans(self):
+        walk = make_walker(self.root_path, cache_path=None, exclude_globs=["*.ext"])
+        expected = get_folder_tree(self.root_path, cache_path=None, exclude_globs=["*.ext"])
+        with patch('src.fsscan._make_exclude_filter') as mock_filter:
+            first = walk()
+            with open(os.path.join(self.subdir1_path, "new.txt"), "w") as f: f.write("new")
+            second = walk()
+            mock_filter.assert_not_called()
+        self.assertEqual(first, expected)
+        self.assertEqual(len(second), len(first) + 1)
+        self.assertNotIn("fileB.ext", {item['name'] for item in second})
+
+    def test_make_walker_root_removed(self):
+        walk = make_walker(self.subdir1_path, cache_path=None)
+        shutil.rmtree(self.subdir1_path)
+        self.assertIsNone(walk())
+
+    def test_tree_deeper_than_recursion_limit(self):
+        deep_path = os.path.join(self.subdir1_path, *(["d"] * 300))
+        os.makedirs(deep_path)
+        with open(os.path.join(deep_path, "deep.txt"), "w") as f: f.write("deep")
+        old_limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(200)
+        try:
+            tree = get_folder_tree(self.root_path, cache_path=None, include_content=True)
+        finally:
+            sys.setrecursionlimit(old_limit)
+        self.assertEqual(tree[-1]['name'], "deep.txt")
+        self.assertEqual(tree[-1]['content'], "deep")
+
+    def test_excluded_dirs_are_skipped(self):
+        os.makedirs(os.path.join(self.root_path, "node_modules", "pkg"))
+        with open(os.path.join(self.root_path, "node_modules", "pkg", "index.js"), "w") as f: f.write("x")
+        tree = get_folder_tree(self.root_path, cache_path=None)
+        nodes = {node['relative_path']: node for node in tree}
+        self.assertEqual(nodes["node_modules"]['type'], "directory_skipped")
+        self.assertNotIn(os.path.join("node_modules", "pkg"), nodes)
+
+        tree = get_folder_tree(self.root_path, cache_path=None, exclude_dirs=())
+        self.assertIn(os.path.join("node_modules", "pkg", "index.js"), {node['relative_path'] for node in tree})
+
+    def test_exclude_globs(self):
+        tree = get_folder_tree(self.root_path, cache_path=None, exclude_globs=["*.ext", "subDir*"])
+        nodes = {node['relative_path']: node for node in tree}
+        self.assertEqual(nodes["subDir1"]['type'], "directory_skipped")
+        self.assertNotIn(os.path.join("subDir1", "fileB.ext"), nodes)
+        tree = get_folder_tree(self.root_path, cache_path=None, exclude_globs=["*.txt"])
+        self.assertNotIn("fileA.txt", {node['relative_path'] for node in tree})
+
+    @unittest.skipUnless(fsscan._pathspec_module() is not None, "pathspec not installed")
+    def test_gitignore(self):
+        with open(os.path.join(self.root_path, ".gitignore"), "w") as f: f.write("subDir1/\n*.txt\n")
+        nodes = {node['relative_path']: node for node in get_folder_tree(self.root_path, cache_path=None)}
+        self.assertEqual(nodes["subDir1"]['type'], "directory_skipped")
+        self.assertNotIn("fileA.txt", nodes)
+        self.assertIn(".hiddenfile", nodes)
+
+    def test_gitignore_with_stub_pathspec(self):
+        class StubSpec:
+            def __init__(self, lines):
+                self.patterns = [line.strip() for line in lines if line.strip()]
+
+            def match_file(self, path):
+                return any(fnmatch.fnmatch(path, pattern) for pattern in self.patterns)
+
+        stub = MagicMock()
+        stub.PathSpec.from_lines.side_effect = lambda kind, lines: StubSpec(lines)
+        with open(os.path.join(self.root_path, ".gitignore"), "w") as f: f.write("subDir1/\n*.txt\n")
+        with patch('src.fsscan._pathspec_module', return_value=stub):
+            nodes = {node['relative_path']: node for node in get_folder_tree(self.root_path, cache_path=None)}
+        stub.PathSpec.from_lines.assert_called_once()
+        self.assertEqual(stub.PathSpec.from_lines.call_args[0][0], "gitwildmatch")
+        self.assertEqual(nodes["subDir1"]['type'], "directory_skipped")
+        self.assertNotIn("fileA.txt", nodes)
+        self.assertIn(".hiddenfile", nodes)
+
+    @patch('builtins.print')
+    def test_gitignore_without_pathspec_warns_once(self, mock_print):
+        fsscan._warn_pathspec_missing.cache_clear()
+        self.addCleanup(fsscan._warn_pathspec_missing.cache_clear)
+        with open(os.path.join(self.root_path, ".gitignore"), "w") as f: f.write("*.txt\n")
+        with patch('src.fsscan._pathspec_module', return_value=None):
+            nodes = {node['relative_path']: node for node in get_folder_tree(self.root_path, cache_path=None)}
+            make_walker(self.root_path, cache_path=None)()
+        self.assertIn("fileA.txt", nodes)
+        mock_print.assert_called_once()
+        self.assertIn("pathspec", mock_print.call_args[0][0])
+
+    @patch('builtins.print')
+    def test_no_gitignore_no_warning(self, mock_print):
+        with patch('src.fsscan._pathspec_module', return_value=None):
+            get_folder_tree(self.root_path, cache_path=None)
+        mock_print.assert_not_called()
+
     def test_empty_directory(self):
         with tempfile.TemporaryDirectory() as empty_dir:
-            tree = get_folder_tree(empty_dir)
+            tree = get_folder_tree(empty_dir, cache_path=None)
             self.assertEqual(tree, []) # An empty directory results in an empty list of items
 
+class TestFindDuplicateFiles(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root_path = self.temp_dir.name
+        os.makedirs(os.path.join(self.root_path, "vendor"))
+        files = {
+            "a.txt": b"same content",
+            os.path.join("vendor", "a_copy.txt"): b"same content",
+            "b.txt": b"same lengthh",  # same size as a.txt, different bytes
+            "unique.txt": b"a size nothing else has",
+            "big1.bin": b"x" * 5000 + b"1",
+            "big2.bin": b"x" * 5000 + b"2",  # same head as big1.bin, different tail
+            "big3.bin": b"x" * 5000 + b"1",
+        }
+        for name, data in files.items():
+            with open(os.path.join(self.root_path, name), "wb") as f:
+                f.write(data)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _path(self, name):
+        return os.path.join(os.path.abspath(self.root_path), name)
+
+    def test_finds_duplicates(self):
+        self.assertEqual(find_duplicate_files(self.root_path, "sha256"), [
+            [self._path("a.txt"), self._path(os.path.join("vendor", "a_copy.txt"))],
+            [self._path("big1.bin"), self._path("big3.bin")],
+        ])
+
+    def test_unique_sizes_are_not_read(self):
+        with patch('src.fsscan._hash_head', wraps=fsscan._hash_head) as mock_head, \
+             patch('src.fsscan.calculate_file_checksum', wraps=fsscan.calculate_file_checksum) as mock_full:
+            find_duplicate_files(self.root_path, "sha256")
+        head_hashed = {c.args[0] for c in mock_head.call_args_list}
+        self.assertNotIn(self._path("unique.txt"), head_hashed)
+        # Small files are settled by the head hash; only the large colliding ones are read in full
+        self.assertEqual({c.args[0] for c in mock_full.call_args_list},
+                         {self._path("big1.bin"), self._path("big2.bin"), self._path("big3.bin")})
+
+    def test_short_reads(self):
+        expected = find_duplicate_files(self.root_path, "sha256")
+        real_read = os.read
+        # a.txt and b.txt share their first 5 bytes
+        with patch('src.fsscan.os.read', side_effect=lambda fd, n: real_read(fd, min(n, 4))):
+            self.assertEqual(find_duplicate_files(self.root_path, "sha256"), expected)
+
+    def test_invalid_root(self):
+        self.assertIsNone(find_duplicate_files(os.path.join(self.root_path, "missing")))
+
+    def test_unsupported_algorithm(self):
+        self.assertIsNone(find_duplicate_files(self.root_path, "invalid_algo"))
+
 if __name__ == '__main__':
     unittest.main(argv=['first-arg-is-ignored'], exit=False)
\ No newline at end of file
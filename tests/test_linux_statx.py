@@ -0,0 +1,66 @@
+import unittest
+from unittest.mock import patch
+import os
+import stat
+import tempfile
+
+from src import linux_statx
+
+
+class TestStat(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.test_file_path = os.path.join(self.temp_dir.name, "statx_file.txt")
+        with open(self.test_file_path, "wb") as f:
+            f.write(b"Hello World") # 11 bytes
+        self.link_path = os.path.join(self.temp_dir.name, "statx_link")
+        os.symlink(self.test_file_path, self.link_path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_matches_os_stat(self):
+        expected = os.stat(self.test_file_path)
+        actual = linux_statx.stat(self.test_file_path)
+        self.assertEqual(actual.st_mode, expected.st_mode)
+        self.assertEqual(actual.st_size, 11)
+        self.assertEqual(actual.st_ino, expected.st_ino)
+        self.assertEqual(actual.st_dev, expected.st_dev)
+        self.assertEqual(actual.st_mtime_ns, expected.st_mtime_ns)
+        self.assertEqual(actual.st_ctime_ns, expected.st_ctime_ns)
+
+    def test_directory(self):
+        self.assertTrue(stat.S_ISDIR(linux_statx.stat(self.temp_dir.name).st_mode))
+
+    def test_symlink_not_followed(self):
+        self.assertTrue(stat.S_ISLNK(linux_statx.stat(self.link_path, follow_symlinks=False).st_mode))
+        self.assertTrue(stat.S_ISREG(linux_statx.stat(self.link_path).st_mode))
+
+    def test_relative_to_dir_fd(self):
+        dir_fd = os.open(self.temp_dir.name, os.O_RDONLY)
+        try:
+            self.assertEqual(linux_statx.stat("statx_file.txt", dir_fd=dir_fd).st_size, 11)
+        finally:
+            os.close(dir_fd)
+
+    def test_file_not_found(self):
+        with self.assertRaises(FileNotFoundError):
+            linux_statx.stat(os.path.join(self.temp_dir.name, "non_existent_file.txt"))
+
+    def test_incomplete_mask_falls_back_to_os_stat(self):
+        def partial_statx(dir_fd, path, flags, mask, buf):
+            buf._obj.stx_mask = mask & ~linux_statx.STATX_MTIME
+            return 0
+
+        with patch.object(linux_statx, '_load_statx', return_value=partial_statx):
+            result = linux_statx.stat(self.test_file_path)
+        self.assertIsInstance(result, os.stat_result)
+        self.assertEqual(result.st_mtime_ns, os.stat(self.test_file_path).st_mtime_ns)
+
+    @patch.object(linux_statx, '_load_statx', return_value=None)
+    def test_fallback_to_os_stat(self, mock_load_statx):
+        self.assertIsInstance(linux_statx.stat(self.test_file_path), os.stat_result)
+        self.assertFalse(linux_statx.is_available())
+
+if __name__ == '__main__':
+    unittest.main()
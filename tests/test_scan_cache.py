@@ -0,0 +1,202 @@
+import unittest
+import os
+import stat
+import tempfile
+import sqlite3
+import time
+from unittest.mock import patch
+
+from src.scan_cache import ScanCache, MemoryCache
+
+MODULE_PATH_PREFIX = "src.scan_cache"
+
+
+class TestScanCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "nested", "scan.db")
+        self.test_file_path = os.path.join(self.temp_dir.name, "cached_file.txt")
+        with open(self.test_file_path, "w") as f:
+            f.write("cached")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_miss_on_empty_cache(self):
+        with ScanCache(self.db_path) as cache:
+            self.assertIsNone(cache.get(os.stat(self.test_file_path), "sha256"))
+
+    def test_database_is_private(self):
+        with ScanCache(self.db_path) as cache:
+            cache.put_many([(os.stat(self.test_file_path), "checksum", "secret")], "sha256")
+        self.assertEqual(stat.S_IMODE(os.stat(os.path.dirname(self.db_path)).st_mode) & 0o077, 0)
+        self.assertEqual(stat.S_IMODE(os.stat(self.db_path).st_mode) & 0o077, 0)
+
+    def test_hit_persists_across_instances(self):
+        st = os.stat(self.test_file_path)
+        with ScanCache(self.db_path) as cache:
+            cache.put_many([(st, "checksum", "cached")], "sha256")
+        with ScanCache(self.db_path) as cache:
+            self.assertEqual(cache.get(st, "sha256"), ("checksum", "cached"))
+            self.assertIsNone(cache.get(st, "md5"))
+
+    def test_changed_file_misses(self):
+        st = os.stat(self.test_file_path)
+        with ScanCache(self.db_path) as cache:
+            cache.put_many([(st, "checksum", "cached")], "sha256")
+        with open(self.test_file_path, "a") as f:
+            f.write(" and changed")
+        with ScanCache(self.db_path) as cache:
+            self.assertIsNone(cache.get(os.stat(self.test_file_path), "sha256"))
+
+    def test_rewrite_with_restored_mtime_misses(self):
+        st = os.stat(self.test_file_path)
+        memory = MemoryCache()
+        with ScanCache(self.db_path, memory=memory) as cache:
+            cache.put_many([(st, "checksum", "cached")], "sha256")
+        # Outlast a coarse kernel clock tick, so the rewrite gets a later ctime
+        time.sleep(0.02)
+        with open(self.test_file_path, "w") as f:
+            f.write("CHANGE")
+        os.utime(self.test_file_path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        changed = os.stat(self.test_file_path)
+        self.assertEqual((changed.st_mtime_ns, changed.st_size), (st.st_mtime_ns, st.st_size))
+        self.assertIsNone(memory.get(changed, "sha256"))
+        with ScanCache(self.db_path) as cache:
+            self.assertIsNone(cache.get(changed, "sha256"))
+
+    def test_put_replaces_stale_entry(self):
+        st = os.stat(self.test_file_path)
+        with ScanCache(self.db_path) as cache:
+            cache.put_many([(st, "old", "old")], "sha256")
+            cache.put_many([(st, "new", None)], "sha256")
+            self.assertEqual(cache.get(st, "sha256"), ("new", None))
+
+    def test_memory_layer_serves_and_fills(self):
+        st = os.stat(self.test_file_path)
+        with ScanCache(self.db_path) as cache:
+            cache.put_many([(st, "checksum", "cached")], "sha256")
+        memory = MemoryCache()
+        with ScanCache(self.db_path, memory=memory) as cache:
+            self.assertEqual(cache.get(st, "sha256"), ("checksum", "cached"))
+        # Filled from the database, now answered without it
+        self.assertEqual(memory.get(st, "sha256"), ("checksum", "cached"))
+
+        other = os.stat(self.temp_dir.name)
+        with ScanCache(self.db_path, memory=memory) as cache:
+            cache.put_many(((s, "dir", None) for s in [other]), "sha256")
+        self.assertEqual(memory.get(other, "sha256"), ("dir", None))
+        with ScanCache(self.db_path) as cache:
+            self.assertEqual(cache.get(other, "sha256"), ("dir", None))
+
+    def test_prune_deletes_rows_unused_past_max_age(self):
+        st = os.stat(self.test_file_path)
+        other = os.stat(self.temp_dir.name)
+        now = time.time()
+        with patch(f"{MODULE_PATH_PREFIX}.time.time", return_value=now - 100):
+            with ScanCache(self.db_path, max_age=1000) as cache:
+                cache.put_many([(st, "used", None), (other, "unused", None)], "sha256")
+        with patch(f"{MODULE_PATH_PREFIX}.time.time", return_value=now - 50):
+            with ScanCache(self.db_path, max_age=1000) as cache:
+                self.assertEqual(cache.get(st, "sha256"), ("used", None))
+        # The hit refreshed st's row, so only the unused one has aged out
+        with ScanCache(self.db_path, max_age=75) as cache:
+            cache.prune()
+        with ScanCache(self.db_path) as cache:
+            self.assertEqual(cache.get(st, "sha256"), ("used", None))
+            self.assertIsNone(cache.get(other, "sha256"))
+
+    def test_close_prunes_at_most_daily(self):
+        st = os.stat(self.test_file_path)
+        now = time.time()
+        with patch(f"{MODULE_PATH_PREFIX}.time.time", return_value=now - 100):
+            with ScanCache(self.db_path) as cache:
+                cache.put_many([(st, "checksum", None)], "sha256")
+        # Pruned by the close above, so this one leaves the expired row alone
+        with ScanCache(self.db_path, max_age=10):
+            pass
+        with ScanCache(self.db_path) as cache:
+            self.assertEqual(cache.get(st, "sha256"), ("checksum", None))
+
+        with patch(f"{MODULE_PATH_PREFIX}.time.time", return_value=now + 2 * 24 * 60 * 60):
+            with ScanCache(self.db_path, max_age=10):
+                pass
+        with ScanCache(self.db_path) as cache:
+            self.assertIsNone(cache.get(st, "sha256"))
+
+    def test_close_enforces_size_bound(self):
+        st = os.stat(self.test_file_path)
+        other = os.stat(self.temp_dir.name)
+        now = time.time()
+        with patch(f"{MODULE_PATH_PREFIX}.time.time", return_value=now - 10):
+            with ScanCache(self.db_path) as cache:
+                cache.put_many([(other, "older", "x" * (1 << 20))], "sha256")
+        # Pruned just now, but over the bound, so closing prunes again
+        with ScanCache(self.db_path, max_bytes=512 << 10) as cache:
+            cache.put_many([(st, "newer", "y" * (100 << 10))], "sha256")
+        with ScanCache(self.db_path) as cache:
+            self.assertEqual(cache.get(st, "sha256"), ("newer", "y" * (100 << 10)))
+            self.assertIsNone(cache.get(other, "sha256"))
+
+    def test_old_schema_is_rebuilt(self):
+        os.makedirs(os.path.dirname(self.db_path))
+        connection = sqlite3.connect(self.db_path)
+        connection.execute(
+            "CREATE TABLE files (dev INTEGER, ino INTEGER, algorithm TEXT, mtime_ns INTEGER,"
+            " size INTEGER, checksum TEXT, content TEXT, PRIMARY KEY (dev, ino, algorithm))"
+        )
+        connection.commit()
+        connection.close()
+
+        st = os.stat(self.test_file_path)
+        with ScanCache(self.db_path) as cache:
+            self.assertIsNone(cache.get(st, "sha256"))
+            cache.put_many([(st, "checksum", None)], "sha256")
+        with ScanCache(self.db_path) as cache:
+            self.assertEqual(cache.get(st, "sha256"), ("checksum", None))
+
+
+class TestMemoryCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.paths = []
+        for i in range(3):
+            path = os.path.join(self.temp_dir.name, f"file{i}.txt")
+            with open(path, "w") as f:
+                f.write(str(i))
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_hit_and_changed_file_misses(self):
+        cache = MemoryCache()
+        st = os.stat(self.paths[0])
+        cache.put_many([(st, "checksum", "0")], "sha256")
+        self.assertEqual(cache.get(st, "sha256"), ("checksum", "0"))
+        self.assertIsNone(cache.get(st, "md5"))
+        with open(self.paths[0], "a") as f:
+            f.write(" and changed")
+        self.assertIsNone(cache.get(os.stat(self.paths[0]), "sha256"))
+
+    def test_evicts_least_recently_used(self):
+        stats = [os.stat(path) for path in self.paths]
+        cache = MemoryCache(max_bytes=2 * 256 + 200)
+        cache.put_many([(stats[0], "a", "x" * 100), (stats[1], "b", "x" * 100)], "sha256")
+        cache.get(stats[0], "sha256")  # Now stats[1] is the least recently used
+        cache.put_many([(stats[2], "c", None)], "sha256")
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(stats[1], "sha256"))
+        self.assertEqual(cache.get(stats[0], "sha256"), ("a", "x" * 100))
+        self.assertEqual(cache.get(stats[2], "sha256"), ("c", None))
+
+    def test_clear(self):
+        cache = MemoryCache()
+        st = os.stat(self.paths[0])
+        cache.put_many([(st, "checksum", "0")], "sha256")
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertIsNone(cache.get(st, "sha256"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 # test_ast_dumper.py
 import unittest
+from unittest.mock import patch
 import ast
 
 from src.sources import dump_python_ast
@@ -110,6 +111,37 @@ class MyClass:
         expected_ast = ast.dump(tree, indent=4)
         self.assert_ast_dump_equals(source_code, expected_ast)
 
+    def test_repeated_source_is_cached(self):
+        """Test that dumping the same source twice reuses the first result."""
+        source_code = "def cached(a):\n    return a * 2"
+        first = dump_python_ast(source_code)
+        self.assertIs(dump_python_ast(source_code), first)
+        self.assertEqual(first, ast.dump(ast.parse(source_code), indent=4))
+
+    def test_bytes_source(self):
+        """Test that bytes are parsed like str, as ast.parse does, and cached apart from it."""
+        expected_ast = ast.dump(ast.parse("x = 1"), indent=4)
+        self.assertEqual(dump_python_ast(b"x = 1"), expected_ast)
+        self.assertEqual(dump_python_ast(b"x = 1"), expected_ast)
+        self.assertEqual(dump_python_ast("x = 1"), expected_ast)
+        latin1 = "# -*- coding: latin-1 -*-\ns = '\xe9'\n"
+        self.assertEqual(dump_python_ast(latin1.encode("latin-1")), ast.dump(ast.parse(latin1), indent=4))
+
+    def test_cache_is_bounded(self):
+        """Test that the least recently used dumps are evicted once the cache is full."""
+        with patch('src.sources.AST_DUMP_CACHE_SIZE', 2):
+            first = dump_python_ast("a = 1")
+            dump_python_ast("b = 2")
+            dump_python_ast("c = 3")
+            self.assertIsNot(dump_python_ast("a = 1"), first)
+            self.assertEqual(dump_python_ast("a = 1"), first)
+
+    def test_syntax_error_not_cached(self):
+        """Test that a syntax error is reported on every call."""
+        source_code = "def broken(:"
+        self.assertTrue(dump_python_ast(source_code).startswith("SyntaxError during parsing:"))
+        self.assertTrue(dump_python_ast(source_code).startswith("SyntaxError during parsing:"))
+
     # The generic "An unexpected error occurred" is hard to trigger reliably
     # without mocking internal ast module functions or finding a very obscure bug.
     # For practical purposes, testing SyntaxError and valid inputs covers most cases.
@@ -0,0 +1,73 @@
+import unittest
+import os
+import tempfile
+
+from src.fsscan import get_folder_tree, iter_tree
+from src.tree_soa import TreeSoA
+
+
+class TestTreeSoA(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root_path = self.temp_dir.name
+        os.makedirs(os.path.join(self.root_path, "subDir1"))
+        os.makedirs(os.path.join(self.root_path, "node_modules"))
+        with open(os.path.join(self.root_path, "fileA.txt"), "w") as f: f.write("contentA")
+        with open(os.path.join(self.root_path, "subDir1", "fileB.ext"), "w") as f: f.write("contentB!")
+        with open(os.path.join(self.root_path, "subDir1", "fileC.txt"), "w") as f: f.write("c")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_round_trip(self):
+        nodes = get_folder_tree(self.root_path, cache_path=None)
+        tree = TreeSoA.from_nodes(nodes)
+        self.assertEqual(len(tree), len(nodes))
+        self.assertEqual(tree.to_list_of_dicts(), nodes)
+        for view, node in zip(tree, nodes):
+            self.assertEqual(view, node)
+            self.assertEqual(list(view), list(node))
+
+    def test_views_behave_like_nodes(self):
+        tree = TreeSoA.from_nodes(iter_tree(self.root_path, cache_path=None, include_content=True))
+        fileA_node = next(item for item in tree if item['name'] == "fileA.txt")
+        self.assertEqual(fileA_node['type'], "file")
+        self.assertEqual(fileA_node['size'], 8)
+        self.assertEqual(fileA_node['content'], "contentA")
+
+        subDir1_node = next(item for item in tree if item['name'] == "subDir1")
+        self.assertIsNone(subDir1_node['size'])
+        self.assertIsNone(subDir1_node['checksum'])
+
+        skipped = next(item for item in tree if item['name'] == "node_modules")
+        self.assertEqual(skipped['type'], "directory_skipped")
+        self.assertNotIn('checksum', skipped)
+        with self.assertRaises(KeyError):
+            skipped['checksum']
+
+        self.assertEqual(tree[-1], tree[len(tree) - 1])
+        with self.assertRaises(IndexError):
+            tree[len(tree)]
+
+    def test_slicing(self):
+        nodes = get_folder_tree(self.root_path, cache_path=None)
+        tree = TreeSoA.from_nodes(nodes)
+        self.assertEqual(tree[1:3], nodes[1:3])
+        self.assertEqual(tree[::-2], nodes[::-2])
+        self.assertEqual(tree[len(tree):], [])
+        with self.assertRaisesRegex(TypeError, "integers or slices"):
+            tree["name"]
+
+    def test_inaccessible_node(self):
+        node = {"name": "locked", "full_path": "/x/locked", "relative_path": "locked",
+                "permissions": "d????????? (Permission Denied)", "type": "directory_inaccessible", "children": []}
+        tree = TreeSoA.from_nodes([node])
+        self.assertEqual(tree.to_list_of_dicts(), [node])
+
+    def test_aggregates(self):
+        tree = TreeSoA.from_nodes(iter_tree(self.root_path, cache_path=None))
+        self.assertEqual(tree.total_size(), len("contentA") + len("contentB!") + len("c"))
+        self.assertEqual(tree.count_by_extension(), {"txt": 2, "ext": 1})
+
+if __name__ == '__main__':
+    unittest.main()